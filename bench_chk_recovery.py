@@ -0,0 +1,448 @@
+"""Benchmarks for chk_recovery on synthetic FOUND.000 folders
+
+Generates reproducible folders of .chk files with a configurable type mix
+(every signature in SIGNATURES, Office OOXML and OLE documents with real
+dates, text, zero-filled fragments and unknown blobs) and times type
+detection, date extraction and a full recovery run on them. Each phase
+runs in a fresh process so its peak RSS can be reported.
+
+    python bench_chk_recovery.py --files 1000 100000 --workers 4
+
+With --startup, the start-up time of the command line is measured instead
+(for hooks that run the tool once per file).
+
+    python bench_chk_recovery.py --startup
+"""
+
+import argparse
+import io
+import json
+import os
+import py_compile
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import chk_recovery
+
+# Default share of each kind of file in the corpus
+DEFAULT_MIX = 'signature=40,ooxml=15,ole=10,text=10,zero=10,unknown=15'
+
+# Sizes of the file contents before cluster slack is appended
+FILE_SIZES = (2048, 8192, 32768, 131072)
+CLUSTER_SIZE = 4096
+
+# Documents with distinct dates built per Office kind; files reuse them
+DOCUMENT_VARIANTS = 8
+
+# Random bytes that signature payloads and unknown blobs are cut from
+RANDOM_POOL_SIZE = 4 * 1024 * 1024
+
+OOXML_KINDS = (('word', 'document.xml'), ('xl', 'workbook.xml'), ('ppt', 'presentation.xml'))
+CORE_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<cp:coreProperties '
+    'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{date}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{date}</dcterms:modified>'
+    '</cp:coreProperties>'
+)
+
+TEXT_LINE = b"The quick brown fox jumps over the lazy dog. 0123456789\r\n"
+
+# Compound File Binary layout used by build_ole_document
+OLE_SECTOR_SIZE = 512
+OLE_MINI_SECTOR_SIZE = 64
+OLE_END_OF_CHAIN = 0xFFFFFFFE
+OLE_FREE = 0xFFFFFFFF
+OLE_FAT_SECTOR = 0xFFFFFFFD
+SUMMARY_FMTID = bytes.fromhex('e0859ff2f94f6810ab9108002b27b3d9')
+
+# Interpreter launches timed per command by bench_startup
+STARTUP_RUNS = 30
+
+
+def parse_mix(text):
+    """Parse 'kind=weight,...' into a dict"""
+    mix = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        if kind not in ('signature', 'ooxml', 'ole', 'text', 'zero', 'unknown'):
+            raise argparse.ArgumentTypeError(f"unknown file kind: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def random_dates(rnd, count):
+    """Return count random datetimes between 2000 and 2024"""
+    start = datetime(2000, 1, 1)
+    return [start + timedelta(seconds=rnd.randrange(25 * 365 * 86400)) for _ in range(count)]
+
+
+def build_ooxml_document(kind, part, date):
+    """Return a minimal OOXML package with a docProps/core.xml date"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', '<Types/>')
+        zf.writestr('_rels/.rels', '<Relationships/>')
+        zf.writestr('docProps/core.xml', CORE_XML.format(date=date.strftime('%Y-%m-%dT%H:%M:%SZ')))
+        zf.writestr(f'{kind}/{part}', '<body>' + '<p>text</p>' * 400 + '</body>')
+    return buffer.getvalue()
+
+
+def build_summary_information(filetime):
+    """Return a SummaryInformation property set holding only the last save time"""
+    properties = struct.pack('<2L', chk_recovery.PIDSI_LASTSAVE_DTM, 16)
+    value = struct.pack('<HHQ', chk_recovery.VT_FILETIME, 0, filetime)
+    section = struct.pack('<2L', 8 + len(properties) + len(value), 1) + properties + value
+    header = (struct.pack('<HH4s16sL', 0xFFFE, 0, b'\x05\x01\x02\x00', bytes(16), 1)
+              + SUMMARY_FMTID + struct.pack('<L', 48))
+    return header + section
+
+
+def ole_directory_entry(name, entry_type, start, size, child=OLE_FREE, right=OLE_FREE):
+    """Return one 128-byte directory entry"""
+    raw_name = name.encode('utf-16-le') + b'\x00\x00'
+    return (raw_name.ljust(64, b'\x00')
+            + struct.pack('<HBB3L', len(raw_name), entry_type, 1, OLE_FREE, right, child)
+            + bytes(36) + struct.pack('<2L', start, size) + bytes(4))
+
+
+def build_ole_document(date, body_size, mini_summary=True):
+    """Return a version 3 compound file dated date
+
+    It holds a WordDocument stream of body_size bytes (at least 4096, the
+    mini stream cutoff) and a SummaryInformation stream, stored in the
+    mini stream or, without mini_summary, padded to the cutoff and stored
+    in regular sectors.
+    """
+    seconds = int((date - datetime(1970, 1, 1)).total_seconds())
+    filetime = chk_recovery.FILETIME_UNIX_EPOCH + seconds * 10 ** 7
+    summary = build_summary_information(filetime)
+    if not mini_summary:
+        summary = summary.ljust(4096, b'\x00')
+    sectors = []
+    fat = []
+
+    def sector_count(size):
+        return max(1, -(-size // OLE_SECTOR_SIZE))
+
+    def allocate(data):
+        count = sector_count(len(data))
+        first = len(sectors)
+        for i in range(count):
+            sectors.append(data[i * OLE_SECTOR_SIZE:(i + 1) * OLE_SECTOR_SIZE]
+                           .ljust(OLE_SECTOR_SIZE, b'\x00'))
+            fat.append(first + i + 1 if i + 1 < count else OLE_END_OF_CHAIN)
+        return first
+
+    # The FAT sectors come first; each maps OLE_SECTOR_SIZE // 4 sectors
+    data_sectors = sector_count(body_size) + sector_count(len(summary)) + 3
+    fat_count = 1
+    while fat_count * (OLE_SECTOR_SIZE // 4) < data_sectors + fat_count:
+        fat_count += 1
+    for _ in range(fat_count):
+        fat[allocate(b'')] = OLE_FAT_SECTOR
+    body_start = allocate(b'\x00' * body_size)
+
+    if mini_summary:
+        mini_count = -(-len(summary) // OLE_MINI_SECTOR_SIZE)
+        mini_stream = summary.ljust(mini_count * OLE_MINI_SECTOR_SIZE, b'\x00')
+        mini_fat = b''.join(struct.pack('<L', i + 1 if i + 1 < mini_count else OLE_END_OF_CHAIN)
+                            for i in range(mini_count))
+        root_start = allocate(mini_stream)
+        mini_fat_start = allocate(mini_fat.ljust(OLE_SECTOR_SIZE, b'\xff'))
+        summary_start, mini_fat_count = 0, 1
+    else:
+        mini_stream = b''
+        root_start = mini_fat_start = OLE_END_OF_CHAIN
+        summary_start, mini_fat_count = allocate(summary), 0
+
+    directory = (ole_directory_entry('Root Entry', chk_recovery.OLE_ROOT_ENTRY, root_start,
+                                     len(mini_stream), child=1)
+                 + ole_directory_entry('WordDocument', chk_recovery.OLE_STREAM_ENTRY,
+                                       body_start, body_size, right=2)
+                 + ole_directory_entry('\x05SummaryInformation', chk_recovery.OLE_STREAM_ENTRY,
+                                       summary_start, len(summary))
+                 + bytes(128))
+    directory_start = allocate(directory)
+
+    per_sector = OLE_SECTOR_SIZE // 4
+    fat += [OLE_FREE] * (fat_count * per_sector - len(fat))
+    for i in range(fat_count):
+        sectors[i] = struct.pack(f'<{per_sector}L', *fat[i * per_sector:(i + 1) * per_sector])
+    difat = struct.pack(f'<{fat_count}L', *range(fat_count))
+    header = (chk_recovery.OLE_SIGNATURE + bytes(16)
+              + struct.pack('<5H', 0x3E, 3, 0xFFFE, 9, 6) + bytes(6)
+              + struct.pack('<9L', 0, fat_count, directory_start, 0, 4096, mini_fat_start,
+                            mini_fat_count, OLE_END_OF_CHAIN, 0)
+              + difat + b'\xff' * (109 * 4 - len(difat)))
+    return header + b''.join(sectors)
+
+
+class CorpusGenerator:
+    """Reproducible generator of .chk file contents for a type mix"""
+
+    def __init__(self, mix, seed=0):
+        self.rnd = random.Random(seed)
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.pool = self.rnd.getrandbits(RANDOM_POOL_SIZE * 8).to_bytes(RANDOM_POOL_SIZE, 'little')
+        self.signatures = sorted(chk_recovery.SIGNATURES)
+
+        dates = random_dates(self.rnd, DOCUMENT_VARIANTS)
+        self.ooxml = [build_ooxml_document(kind, part, date)
+                      for kind, part in OOXML_KINDS for date in dates]
+        self.ole = [build_ole_document(date, max(4096, self.rnd.choice(FILE_SIZES)))
+                    for date in dates]
+
+    def random_bytes(self, size):
+        """Return size random bytes cut from the pool"""
+        offset = self.rnd.randrange(RANDOM_POOL_SIZE - size)
+        return self.pool[offset:offset + size]
+
+    def slack(self, size):
+        """Return the zero cluster slack chkdsk leaves after size bytes"""
+        return bytes(-size % CLUSTER_SIZE)
+
+    def generate(self):
+        """Return the contents of the next .chk file"""
+        kind = self.rnd.choices(self.kinds, self.weights)[0]
+        size = self.rnd.choice(FILE_SIZES)
+
+        if kind == 'signature':
+            signature = self.rnd.choice(self.signatures)
+            data = signature + self.random_bytes(size - len(signature))
+            if signature == b'RIFF':
+                data = (signature + struct.pack('<L', size - 8)
+                        + self.rnd.choice((b'WAVE', b'AVI ', b'WEBP')) + data[12:])
+        elif kind == 'ooxml':
+            data = self.rnd.choice(self.ooxml)
+        elif kind == 'ole':
+            data = self.rnd.choice(self.ole)
+        elif kind == 'text':
+            data = TEXT_LINE * (size // len(TEXT_LINE))
+        elif kind == 'zero':
+            return bytes(size)
+        else:
+            data = self.random_bytes(size)
+        return data + self.slack(len(data))
+
+
+def generate_corpus(folder, count, mix, seed=0):
+    """Write count .chk files into folder; returns their total size"""
+    os.makedirs(folder, exist_ok=True)
+    generator = CorpusGenerator(mix, seed)
+    total_bytes = 0
+    for i in range(1, count + 1):
+        data = generator.generate()
+        with open(os.path.join(folder, f'FILE{i:07d}.CHK'), 'wb') as f:
+            f.write(data)
+        total_bytes += len(data)
+    return total_bytes
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes (None if unknown)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return max(peak, children) * scale
+
+
+def iter_paths(folder):
+    """Yield the paths and sizes of the .chk files of folder"""
+    for entry in chk_recovery.iter_chk_entries(folder):
+        yield entry.path, entry.stat().st_size
+
+
+def bench_detect(folder, workers):
+    """Time detect_file_type on every file"""
+    files = total_bytes = 0
+    started = time.perf_counter()
+    for path, size in iter_paths(folder):
+        chk_recovery.detect_file_type(path)
+        files += 1
+        total_bytes += size
+    return files, total_bytes, time.perf_counter() - started, peak_rss()
+
+
+def bench_date(folder, workers):
+    """Time get_file_date on every file, with types detected beforehand"""
+    typed = [(path, size, chk_recovery.detect_file_type(path)) for path, size in iter_paths(folder)]
+    started = time.perf_counter()
+    for path, _, ext in typed:
+        if ext:
+            chk_recovery.get_file_date(path, ext)
+    elapsed = time.perf_counter() - started
+    return len(typed), sum(size for _, size, _ in typed), elapsed, peak_rss()
+
+
+def bench_process(folder, workers):
+    """Time a full process_chk_files run (renames the files)"""
+    total_bytes = sum(size for _, size in iter_paths(folder))
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        chk_recovery.process_chk_files(folder, workers=workers)
+    elapsed = time.perf_counter() - started
+    files = sum(1 for _ in os.scandir(folder))
+    return files, total_bytes, elapsed, peak_rss()
+
+
+PHASES = (
+    ('detect_file_type', bench_detect),
+    ('get_file_date', bench_date),
+    ('process_chk_files', bench_process),
+)
+
+
+def run_isolated(function, *args):
+    """Run function(*args) in a fresh process and return its result"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(function, *args).result()
+
+
+def run_benchmarks(sizes, mix, seed=0, workers=1, workdir=None, keep=False):
+    """Generate a corpus per size and run every phase on it; returns result dicts"""
+    results = []
+    base = tempfile.mkdtemp(prefix='chk_bench_', dir=workdir)
+    try:
+        for count in sizes:
+            folder = os.path.join(base, f'FOUND.{count}')
+            started = time.perf_counter()
+            total_bytes = generate_corpus(folder, count, mix, seed)
+            print(f"Generated {count} files ({total_bytes / 1048576:.1f} MB) "
+                  f"in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+            for name, function in PHASES:
+                files, phase_bytes, elapsed, rss = run_isolated(function, folder, workers)
+                results.append({
+                    'files': files,
+                    'phase': name,
+                    'workers': workers,
+                    'seconds': elapsed,
+                    'files_per_second': files / elapsed if elapsed else None,
+                    'mb_per_second': phase_bytes / 1048576 / elapsed if elapsed else None,
+                    'peak_rss': rss,
+                })
+                print(format_result(results[-1]), file=sys.stderr)
+    finally:
+        if keep:
+            print(f"Corpus kept in {base}", file=sys.stderr)
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+    return results
+
+
+def import_time(module):
+    """Cumulative import time of module in microseconds, from -X importtime"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            stderr=subprocess.PIPE, text=True,
+                            cwd=os.path.dirname(os.path.abspath(chk_recovery.__file__))).stderr
+    for line in output.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])
+    return None
+
+
+def bench_startup(runs=STARTUP_RUNS):
+    """Time interpreter launches: bare, importing chk_recovery, --help and --check
+
+    The bytecode of chk_recovery is compiled first, as an installed tool's
+    would be. Returns result dicts with the mean milliseconds per launch.
+    """
+    py_compile.compile(chk_recovery.__file__)
+    cwd = os.path.dirname(os.path.abspath(chk_recovery.__file__))
+
+    with tempfile.TemporaryDirectory() as folder:
+        sample = os.path.join(folder, 'FILE0001.CHK')
+        with open(sample, 'wb') as f:
+            f.write(CorpusGenerator(parse_mix('ooxml=1')).generate())
+
+        commands = (
+            ('python -c pass', ['-c', 'pass']),
+            ('import chk_recovery', ['-c', 'import chk_recovery']),
+            ('--help', ['-m', 'chk_recovery', '--help']),
+            ('--check FILE', ['-m', 'chk_recovery', '--check', sample]),
+        )
+        results = []
+        for name, args in commands:
+            command = [sys.executable, *args]
+            subprocess.run(command, stdout=subprocess.DEVNULL, cwd=cwd, check=True)
+            started = time.perf_counter()
+            for _ in range(runs):
+                subprocess.run(command, stdout=subprocess.DEVNULL, cwd=cwd, check=True)
+            results.append({'command': name,
+                            'ms': (time.perf_counter() - started) / runs * 1000})
+            print(f"{name:<22} {results[-1]['ms']:>8.1f} ms", file=sys.stderr)
+
+    import_us = import_time('chk_recovery')
+    if import_us is not None:
+        print(f"{'-X importtime':<22} {import_us / 1000:>8.1f} ms", file=sys.stderr)
+    results.append({'command': '-X importtime', 'ms': import_us / 1000 if import_us else None})
+    return results
+
+
+def format_result(result):
+    """One table row for a result dict"""
+    rss = f"{result['peak_rss'] / 1048576:.0f}" if result['peak_rss'] else '?'
+    return (f"{result['files']:>9} {result['phase']:<18} {result['seconds']:>9.2f} "
+            f"{result['files_per_second'] or 0:>11.0f} {result['mb_per_second'] or 0:>9.1f} "
+            f"{rss:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chk_recovery on synthetic .chk files")
+    parser.add_argument('--files', type=int, nargs='+', default=[1000],
+                        help="corpus sizes to run (default: 1000; e.g. 1000 100000 1000000)")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"share of each kind of file (default: {DEFAULT_MIX})")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed of the corpus (default: 0)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes for the process_chk_files phase")
+    parser.add_argument('--workdir', metavar='DIR',
+                        help="directory for the corpus (default: system temp directory)")
+    parser.add_argument('--keep', action='store_true',
+                        help="keep the generated corpus")
+    parser.add_argument('--json', metavar='PATH',
+                        help="also write the results to PATH as JSON")
+    parser.add_argument('--startup', action='store_true',
+                        help="measure the start-up time of the command line instead")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        results = bench_startup()
+    else:
+        print(f"{'Files':>9} {'Phase':<18} {'Seconds':>9} {'Files/s':>11} {'MB/s':>9} "
+              f"{'RSS MB':>8}", file=sys.stderr)
+        results = run_benchmarks(args.files, args.mix, args.seed, args.workers, args.workdir,
+                                 args.keep)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
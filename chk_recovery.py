@@ -1,8 +1,26 @@
+import errno
+import mmap
 import os
-import zipfile
-from datetime import datetime
 import struct
-import xml.etree.ElementTree as ET
+import sys
+import time
+import zlib
+
+# Everything else (argparse, asyncio, collections, concurrent.futures,
+# datetime, functools, hashlib, itertools, json, re, sqlite3, xml.etree,
+# zipfile) is imported where it is first needed, so that short runs
+# (--help, --check, folders without ZIP or OLE files) start fast
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Number of leading bytes used for type detection
+HEADER_SIZE = 512
+
+# Upper bound for header prefetch threads (see iter_headers)
+MAX_PREFETCH_THREADS = 16
 
 # Known file signatures (Hex → File extension)
 SIGNATURES = {
@@ -20,7 +38,6 @@ SIGNATURES = {
     b'\x00\x00\x01\x00': '.ico',
     b'\x49\x49\x2A\x00': '.tif',
     b'\x4D\x4D\x00\x2A': '.tif',
-    b'RIFF': '.webp',  # Will be refined in detect_file_type
 
     # Documents
     b'%PDF-': '.pdf',
@@ -34,7 +51,6 @@ SIGNATURES = {
     b'\xFF\xF2': '.mp3',
     b'OggS': '.ogg',
     b'fLaC': '.flac',
-    b'RIFF': '.wav',  # Will be refined in detect_file_type
 
     # Video
     b'\x00\x00\x00\x18ftypmp4': '.mp4',
@@ -44,7 +60,7 @@ SIGNATURES = {
     b'ftypisom': '.mp4',
     b'ftypMSNV': '.mp4',
     b'ftypM4V': '.m4v',
-    b'RIFF': '.avi',  # Will be refined in detect_file_type
+    b'RIFF': '.avi',  # RIFF (WAV/AVI/WebP) is refined in detect_file_type
     b'\x1A\x45\xDF\xA3': '.mkv',
     b'FLV\x01': '.flv',
     b'\x00\x00\x01\xBA': '.mpg',
@@ -60,6 +76,123 @@ SIGNATURES = {
 }
 
 
+def build_signature_index(signatures):
+    """Build a first-byte dispatch table for the signature list"""
+    # One bucket per possible first byte, longest signature first so the
+    # first hit in a bucket is the longest match
+    index = [()] * 256
+    for sig, ext in signatures.items():
+        index[sig[0]] = index[sig[0]] + ((sig, ext),)
+    return [tuple(sorted(bucket, key=lambda item: len(item[0]), reverse=True))
+            for bucket in index]
+
+
+SIGNATURE_INDEX = build_signature_index(SIGNATURES)
+
+# ZIP-based Office formats that carry a Date Last Saved in docProps/core.xml
+OFFICE_XML_EXTENSIONS = ('.docx', '.xlsx', '.pptx')
+
+# ZIP record sizes and the member names that decide a ZIP-based type, in
+# the precedence order of zip_subtype
+ZIP_EOCD_SIZE = 22
+ZIP_CENTRAL_ENTRY_SIZE = 46
+ZIP_LOCAL_HEADER_SIZE = 30
+ZIP_MEMBER_MAX_SIZE = 16 * 1024 * 1024
+ZIP_MEMBER_CHUNK_SIZE = 4096
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_OFFICE_PREFIXES = {'word/': '.docx', 'xl/': '.xlsx', 'ppt/': '.pptx'}
+ZIP_MANIFESTS = {'META-INF/MANIFEST.MF': '.jar', 'AndroidManifest.xml': '.apk'}
+
+# Start tag of the Date Last Saved in docProps/core.xml and days per month
+CORE_XML_MODIFIED_TAG = b'<dcterms:modified'
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Compound File Binary (OLE) constants
+OLE_SIGNATURE = b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1'
+OLE_MAX_REGULAR_SECTOR = 0xFFFFFFFA
+OLE_MAX_CHAIN = 1 << 20
+OLE_STREAM_ENTRY = 2
+OLE_ROOT_ENTRY = 5
+PIDSI_LASTSAVE_DTM = 13
+VT_FILETIME = 0x40
+VT_FILETIME_TAG = b'\x40\x00\x00\x00'
+FILETIME_UNIX_EPOCH = 116444736000000000
+
+# Plausible FILETIME range for the heuristic scan (2000-2038) and a byte
+# regex matching its two most significant bytes (see find_filetime_candidates)
+FILETIME_MIN = FILETIME_UNIX_EPOCH + 946684800 * 10000000
+FILETIME_MAX = FILETIME_UNIX_EPOCH + 2147483647 * 10000000
+FILETIME_PREFILTER = b'(?=[\xBF-\xEA]\x01)'
+
+# Classification cache limits (see ClassificationCache)
+CACHE_MAX_ENTRIES = 1000000
+CACHE_COMMIT_INTERVAL = 500
+
+# Deduplication: bytes hashed at each end of a file for the partial hash,
+# and the hashing thread count (see find_duplicates)
+DEDUP_BLOCK = 64 * 1024
+DEDUP_THREADS = 4
+
+# Carving: shortest signature used, longer patterns for the formats with
+# shorter signatures, required header alignment and the write chunk size
+# (see carve_chk_file)
+CARVE_MIN_SIGNATURE = 4
+CARVE_PATTERNS = (
+    rb'\xFF\xD8\xFF[\xC0-\xFE]',  # JPEG: SOI and the first marker
+    rb'BM[\s\S]{4}\x00{4}[\s\S]{2}\x00\x00[\x0C\x28\x38\x40\x6C\x7C]\x00{3}',  # BMP
+    rb'ID3[\x02-\x04]\x00',  # MP3 with an ID3v2 tag
+)
+CARVE_ALIGNMENT = 512
+CARVE_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Trimming: data after the detected end of a file is only cut if it is all
+# zeros or shorter than one cluster (see true_file_size)
+TRIM_CLUSTER_SIZE = 4096
+
+# Type reported by analyze_chk_file for empty, sparse and all-zero files,
+# and the zero block they are compared against (see is_empty_file)
+EMPTY_TYPE = 'empty'
+ZERO_CHUNK_SIZE = 1024 * 1024
+ZERO_CHUNK = bytes(ZERO_CHUNK_SIZE)
+
+# Journal: default file name in the recovered folder and fsync batching
+# (see RecoveryJournal)
+JOURNAL_NAME = 'chk_recovery_journal.jsonl'
+JOURNAL_SYNC_INTERVAL = 256
+JOURNAL_SYNC_SECONDS = 1.0
+
+# Copies into an output directory: Linux reflink ioctl and the buffer size
+# of the fallback copy (see copy_file_data)
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Latency histograms of PipelineStats: power-of-two microsecond buckets
+HISTOGRAM_BUCKETS = 32
+
+# Progress display: redraws per second on a terminal, seconds between
+# lines when piped, types shown, and the write buffer of the per-file log
+PROGRESS_RATE = 4
+PROGRESS_PIPE_INTERVAL = 10
+PROGRESS_TOP_TYPES = 4
+LOG_BUFFER_SIZE = 1024 * 1024
+
+# Deletion tables for text_ratio: everything that is not a text character
+# (printable ASCII, tab, LF, CR), and the 7-bit ASCII range
+_NON_TEXT_BYTES = bytes(b for b in range(256) if not (32 <= b <= 126 or b in (9, 10, 13)))
+_ASCII_BYTES = bytes(range(128))
+
+
+def match_signature(header):
+    """Return the extension of the longest signature matching header"""
+    if not header:
+        return None
+    for sig, ext in SIGNATURE_INDEX[header[0]]:
+        if header.startswith(sig):
+            return ext
+    return None
+
+
 def print_header():
     """Display program logo and information"""
     print("=" * 60)
@@ -70,56 +203,83 @@ def print_header():
     print()
 
 
-def detect_file_type(file_path):
-    """Detect file type based on signature"""
+def read_header(file_path):
+    """Read the first HEADER_SIZE bytes of a file"""
+    with open(file_path, 'rb') as f:
+        return f.read(HEADER_SIZE)
+
+
+def detect_file_type(file_path, header=None):
+    """Detect file type based on signature
+
+    header may hold the already read first HEADER_SIZE bytes of the file.
+    """
+    return classify_file(file_path, header, with_date=False)[0]
+
+
+def classify_file(file_path, header=None, with_date=True, timings=None):
+    """Detect file type, returning (extension, Date Last Saved)
+
+    The date is only filled in for ZIP-based Office documents, where it is
+    read from the same ZIP parse that determines the subtype (see
+    analyze_zip). Other types return None as the date. The seconds spent
+    in text detection and ZIP analysis are added to timings if given.
+    """
     try:
         # Read first 512 bytes
-        with open(file_path, 'rb') as f:
-            header = f.read(512)
-
-            # Check for text files first (UTF-8, ASCII)
-            if is_text_file(header):
-                return '.txt'
-
-            # Check specific RIFF-based formats
-            if header.startswith(b'RIFF') and len(header) >= 12:
-                riff_type = header[8:12]
-                if riff_type == b'WAVE':
-                    return '.wav'
-                elif riff_type == b'AVI ':
-                    return '.avi'
-                elif riff_type == b'WEBP':
-                    return '.webp'
-
-            # Check for video formats with ftyp
-            if b'ftyp' in header[:32]:
-                ftyp_pos = header.find(b'ftyp')
-                if ftyp_pos != -1 and ftyp_pos + 8 <= len(header):
-                    brand = header[ftyp_pos + 4:ftyp_pos + 8]
-                    if brand in [b'mp41', b'mp42', b'isom', b'M4V ', b'MSNV']:
-                        return '.mp4'
-                    elif brand == b'M4V ':
-                        return '.m4v'
-
-            # Check standard signatures
-            for sig, ext in SIGNATURES.items():
-                if header.startswith(sig):
-                    if ext == '.ole':
-                        # Check specifically for .msg
-                        if b'__substg1.0_1000001E' in header:
-                            return '.msg'
-                        # Default to .doc for OLE
-                        return '.doc'
-                    elif ext == '.zip':
-                        # Analyze ZIP content to determine specific type
-                        return analyze_zip_content(file_path)
-                    else:
-                        return ext
+        if header is None:
+            header = read_header(file_path)
+
+        # Check for text files first (UTF-8, ASCII)
+        started = time.perf_counter()
+        is_text = is_text_file(header)
+        if timings is not None:
+            timings['text'] = time.perf_counter() - started
+        if is_text:
+            return '.txt', None
+
+        # Check specific RIFF-based formats
+        if header.startswith(b'RIFF') and len(header) >= 12:
+            riff_type = header[8:12]
+            if riff_type == b'WAVE':
+                return '.wav', None
+            elif riff_type == b'AVI ':
+                return '.avi', None
+            elif riff_type == b'WEBP':
+                return '.webp', None
+
+        # Check for video formats with ftyp
+        if b'ftyp' in header[:32]:
+            ftyp_pos = header.find(b'ftyp')
+            if ftyp_pos != -1 and ftyp_pos + 8 <= len(header):
+                brand = header[ftyp_pos + 4:ftyp_pos + 8]
+                if brand in [b'mp41', b'mp42', b'isom', b'M4V ', b'MSNV']:
+                    return '.mp4', None
+                elif brand == b'M4V ':
+                    return '.m4v', None
+
+        # Check standard signatures
+        ext = match_signature(header)
+        if ext == '.ole':
+            # Check specifically for .msg
+            if b'__substg1.0_1000001E' in header:
+                return '.msg', None
+            # Default to .doc for OLE
+            return '.doc', None
+        elif ext == '.zip':
+            # Analyze ZIP content to determine specific type
+            started = time.perf_counter()
+            result = analyze_zip(file_path, with_date)
+            if timings is not None:
+                timings['zip'] = time.perf_counter() - started
+            return result
+        elif ext:
+            return ext, None
 
     except Exception:
         pass
 
-    return None
+    return None, None
 
 
 def is_text_file(data):
@@ -133,60 +293,230 @@ def is_text_file(data):
     if data.startswith(b'\xFF\xFE') or data.startswith(b'\xFE\xFF'):  # UTF-16 BOM
         return True
 
-    # Check first 512 bytes for text characteristics
-    text_characters = 0
-    printable_chars = 0
-
-    for byte in data[:512]:
-        if 32 <= byte <= 126:  # Printable ASCII
-            printable_chars += 1
-            text_characters += 1
-        elif byte in [9, 10, 13]:  # Tab, LF, CR
-            text_characters += 1
-        elif byte < 32 or byte > 126:  # Non-printable
-            # Allow some non-printable characters for UTF-8
-            if byte >= 128:  # Potential UTF-8
-                text_characters += 0.5
-
     # If more than 70% are text characters, consider it a text file
-    if len(data) > 0:
-        text_ratio = text_characters / len(data[:512])
-        return text_ratio > 0.7
+    return text_ratio(data) > 0.7
+
+
+def text_ratio(data):
+    """Share of text characters in the first 512 bytes of data
+
+    Printable ASCII, tab, LF and CR count fully, bytes >= 128 (potential
+    UTF-8) count half. Counting is done with bytes.translate at C speed.
+    """
+    sample = data[:512]
+    if not sample:
+        return 0.0
 
-    return False
+    text_characters = len(sample.translate(None, _NON_TEXT_BYTES))
+    high_characters = len(sample.translate(None, _ASCII_BYTES))
+    return (text_characters + high_characters / 2) / len(sample)
 
 
 def analyze_zip_content(file_path):
     """Analyze ZIP file content to determine specific type"""
+    return analyze_zip(file_path)[0]
+
+
+def analyze_zip(file_path, with_date=False):
+    """Analyze a ZIP file with a single parse of its central directory
+
+    Returns (extension, Date Last Saved). With with_date, the date of
+    .docx/.xlsx/.pptx files is read from docProps/core.xml of the already
+    open archive; otherwise the date is None.
+
+    The central directory is streamed and the scan stops as soon as the
+    type is decided (see scan_zip_directory). Archives the streaming scan
+    cannot handle (ZIP64, damaged directories) go through zipfile instead.
+    """
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            namelist = zip_ref.namelist()
+        with open(file_path, 'rb') as f:
+            ext, core_entry = scan_zip_directory(f, with_date)
+
+            date_name = None
+            if core_entry is not None:
+                date_name = scan_core_xml_date(iter_zip_member(f, core_entry))
+
+            return ext, date_name
+
+    except (ZipScanError, struct.error, zlib.error):
+        pass
+    except Exception:
+        return '.zip', None
+
+    return analyze_zip_file(file_path, with_date)
 
-            # Check for Office document signatures
-            if '[Content_Types].xml' in namelist:
-                if any(name.startswith('word/') for name in namelist):
-                    return '.docx'
-                elif any(name.startswith('xl/') for name in namelist):
-                    return '.xlsx'
-                elif any(name.startswith('ppt/') for name in namelist):
-                    return '.pptx'
 
-            # Check for other specific ZIP-based formats
-            if 'META-INF/MANIFEST.MF' in namelist:
-                return '.jar'  # Java Archive
+def analyze_zip_file(file_path, with_date=False):
+    """analyze_zip using zipfile to read the full name list"""
+    import zipfile
+
+    try:
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            namelist = zip_ref.namelist()
+            ext = zip_subtype(namelist)
 
-            if 'AndroidManifest.xml' in namelist:
-                return '.apk'  # Android Package
+            date_name = None
+            if with_date and ext in OFFICE_XML_EXTENSIONS:
+                date_name = read_core_xml_date(zip_ref, namelist)
 
-            # Default to regular ZIP file
-            return '.zip'
+            return ext, date_name
 
     except zipfile.BadZipFile:
         # If it starts with PK but isn't a valid ZIP, might be corrupted
-        return '.zip'
+        return '.zip', None
     except Exception:
         pass
 
+    return '.zip', None
+
+
+class ZipScanError(ValueError):
+    """An archive the streaming ZIP scan cannot handle"""
+
+
+def iter_zip_central_directory(f):
+    """Stream the central directory entries of the ZIP file f
+
+    Locates the end of central directory record with one seek from the end
+    and then yields (name, compression method, compressed size, local
+    header offset) per entry, without building the full name list.
+    Raises ZipScanError if the directory cannot be streamed.
+    """
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    tail_size = min(file_size, ZIP_EOCD_SIZE + 0xFFFF)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+
+    eocd_pos = tail.rfind(b'PK\x05\x06')
+    if eocd_pos < 0 or eocd_pos + ZIP_EOCD_SIZE > len(tail):
+        raise ZipScanError("End of central directory not found")
+
+    (_, _, _, _, entry_count, cd_size, cd_offset,
+     _) = struct.unpack('<4s4H2LH', tail[eocd_pos:eocd_pos + ZIP_EOCD_SIZE])
+    if entry_count == 0xFFFF or cd_offset == 0xFFFFFFFF:
+        raise ZipScanError("ZIP64 archive")
+
+    # Data prepended to the archive shifts all recorded offsets
+    cd_start = file_size - tail_size + eocd_pos - cd_size
+    shift = cd_start - cd_offset
+    if cd_start < 0 or shift < 0:
+        raise ZipScanError("Bad central directory offset")
+
+    f.seek(cd_start)
+    for _ in range(entry_count):
+        entry = f.read(ZIP_CENTRAL_ENTRY_SIZE)
+        if len(entry) < ZIP_CENTRAL_ENTRY_SIZE or not entry.startswith(b'PK\x01\x02'):
+            raise ZipScanError("Bad central directory entry")
+
+        (_, _, _, flags, method, _, _, _, comp_size, _, name_len, extra_len,
+         comment_len, _, _, _, local_offset) = struct.unpack('<4s6H3L5H2L', entry)
+        raw_name = f.read(name_len)
+        if extra_len or comment_len:
+            f.seek(extra_len + comment_len, os.SEEK_CUR)
+
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+        yield name, method, comp_size, local_offset + shift
+
+
+def scan_zip_directory(f, with_date=False):
+    """Determine the ZIP-based type of f with the precedence of zip_subtype
+
+    Returns (extension, core.xml entry). The scan stops early once
+    '[Content_Types].xml' and a 'word/' part decide a .docx (and, with
+    with_date, docProps/core.xml has been found); every other type is only
+    decided at the end of the directory.
+    """
+    has_content_types = False
+    office_prefixes = set()
+    manifests = set()
+    core_entry = None
+
+    for entry in iter_zip_central_directory(f):
+        name = entry[0]
+        top_dir = name[:name.find('/') + 1]
+        if name == '[Content_Types].xml':
+            has_content_types = True
+        elif with_date and name == 'docProps/core.xml':
+            core_entry = entry
+        elif top_dir in ZIP_OFFICE_PREFIXES:
+            office_prefixes.add(top_dir)
+        elif name in ZIP_MANIFESTS:
+            manifests.add(name)
+
+        if (has_content_types and 'word/' in office_prefixes
+                and (not with_date or core_entry is not None)):
+            return '.docx', core_entry
+
+    if has_content_types:
+        for prefix, ext in ZIP_OFFICE_PREFIXES.items():
+            if prefix in office_prefixes:
+                return ext, core_entry
+    for name, ext in ZIP_MANIFESTS.items():
+        if name in manifests:
+            return ext, None
+    return '.zip', None
+
+
+def iter_zip_member(f, entry, chunk_size=ZIP_MEMBER_CHUNK_SIZE):
+    """Decompress one archive member found by the directory scan in chunks
+
+    Yields at most chunk_size bytes at a time, so a reader that stops early
+    neither reads nor inflates the rest of the member.
+    """
+    _, method, comp_size, local_offset = entry
+    if method not in (ZIP_STORED, ZIP_DEFLATED):
+        raise ZipScanError("Unsupported compression method")
+
+    f.seek(local_offset)
+    local_header = f.read(ZIP_LOCAL_HEADER_SIZE)
+    if len(local_header) < ZIP_LOCAL_HEADER_SIZE or not local_header.startswith(b'PK\x03\x04'):
+        raise ZipScanError("Bad local file header")
+
+    name_len, extra_len = struct.unpack('<2H', local_header[26:30])
+    f.seek(name_len + extra_len, os.SEEK_CUR)
+
+    decompressor = zlib.decompressobj(-15) if method == ZIP_DEFLATED else None
+    remaining = comp_size
+    while remaining > 0:
+        data = f.read(min(chunk_size, remaining))
+        if not data:
+            raise ZipScanError("Truncated member")
+        remaining -= len(data)
+
+        if decompressor is None:
+            yield data
+            continue
+
+        # Cap every step so a highly compressed member cannot balloon
+        while data:
+            chunk = decompressor.decompress(data, chunk_size)
+            if chunk:
+                yield chunk
+            data = decompressor.unconsumed_tail
+        if decompressor.eof:
+            return
+
+
+def zip_subtype(namelist):
+    """Determine the specific ZIP-based type from the archive member names"""
+    # Check for Office document signatures
+    if '[Content_Types].xml' in namelist:
+        if any(name.startswith('word/') for name in namelist):
+            return '.docx'
+        elif any(name.startswith('xl/') for name in namelist):
+            return '.xlsx'
+        elif any(name.startswith('ppt/') for name in namelist):
+            return '.pptx'
+
+    # Check for other specific ZIP-based formats
+    if 'META-INF/MANIFEST.MF' in namelist:
+        return '.jar'  # Java Archive
+
+    if 'AndroidManifest.xml' in namelist:
+        return '.apk'  # Android Package
+
+    # Default to regular ZIP file
     return '.zip'
 
 
@@ -194,7 +524,7 @@ def get_office_last_saved(file_path, file_ext):
     """Try to extract 'Date Last Saved' from Office documents"""
     try:
         # For modern Office formats (docx, xlsx, pptx)
-        if file_ext in ['.docx', '.xlsx', '.pptx']:
+        if file_ext in OFFICE_XML_EXTENSIONS:
             return get_office_xml_date(file_path)
 
         # For old Office formats (.doc, .xls, .ppt) - OLE-based
@@ -209,26 +539,120 @@ def get_office_last_saved(file_path, file_ext):
 
 def get_office_xml_date(file_path):
     """Extract Last Saved Date from modern Office documents (XML-based)"""
+    return analyze_zip(file_path, with_date=True)[1]
+
+
+def read_core_xml_date(zip_ref, namelist=None):
+    """Read the Last Saved Date from docProps/core.xml of an open ZIP"""
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            # Read Core Properties
-            if 'docProps/core.xml' in zip_ref.namelist():
-                core_xml = zip_ref.read('docProps/core.xml').decode('utf-8')
-                root = ET.fromstring(core_xml)
-
-                # Define namespace
-                namespaces = {
-                    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
-                    'dcterms': 'http://purl.org/dc/terms/'
-                }
-
-                # Search for Last Modified Date
-                modified_elem = root.find('.//dcterms:modified', namespaces)
-                if modified_elem is not None and modified_elem.text:
-                    # Parse ISO 8601 format: 2024-01-15T14:30:22Z
-                    date_str = modified_elem.text.replace('Z', '+00:00')
-                    date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                    return date_obj.strftime("%Y-%m-%d_%H-%M-%S")
+        if namelist is None:
+            namelist = zip_ref.namelist()
+
+        # Read Core Properties
+        if 'docProps/core.xml' in namelist:
+            with zip_ref.open('docProps/core.xml') as member:
+                return scan_core_xml_date(
+                    iter(lambda: member.read(ZIP_MEMBER_CHUNK_SIZE), b''))
+
+    except Exception:
+        pass
+
+    return None
+
+
+def scan_core_xml_date(chunks, max_size=ZIP_MEMBER_MAX_SIZE):
+    """Find dcterms:modified in the chunks of docProps/core.xml
+
+    Searches the raw bytes for the element and stops reading as soon as its
+    text is complete. Documents the byte search cannot handle (other
+    encodings or prefixes, entities, other date formats) are read to the
+    end and parsed by parse_core_xml_date.
+    """
+    chunks = iter(chunks)
+    data = bytearray()
+    start = end = -1
+
+    for chunk in chunks:
+        searched = max(len(data) - len(CORE_XML_MODIFIED_TAG), 0)
+        data += chunk
+        if len(data) > max_size:
+            return None
+        if start < 0:
+            start = data.find(CORE_XML_MODIFIED_TAG, searched)
+            searched = start + len(CORE_XML_MODIFIED_TAG)
+        if start >= 0:
+            end = data.find(b'<', max(searched, start + 1))
+            if end >= 0:
+                break
+
+    if end >= 0:
+        element = bytes(data[start + len(CORE_XML_MODIFIED_TAG):end])
+        text_start = element.find(b'>')
+        if element[:1] in (b'>', b' ', b'\t', b'\r', b'\n') and text_start >= 0:
+            if element[text_start - 1:text_start] == b'/':
+                return None  # <dcterms:modified/>
+            date_name = format_iso_date(element[text_start + 1:].strip())
+            if date_name:
+                return date_name
+
+    for chunk in chunks:
+        data += chunk
+        if len(data) > max_size:
+            return None
+    return parse_core_xml_date(bytes(data))
+
+
+def format_iso_date(value):
+    """Format YYYY-MM-DDTHH:MM:SS[Z|+HH:MM] (bytes) as a file name
+
+    Returns None for any other form, which is left to datetime.
+    """
+    if (len(value) < 19 or value[4:5] != b'-' or value[7:8] != b'-'
+            or value[10:11] != b'T' or value[13:14] != b':' or value[16:17] != b':'):
+        return None
+
+    suffix = value[19:]
+    if suffix not in (b'', b'Z') and not (
+            len(suffix) == 6 and suffix[:1] in (b'+', b'-') and suffix[3:4] == b':'
+            and (suffix[1:3] + suffix[4:]).isdigit()):
+        return None
+
+    fields = (value[0:4], value[5:7], value[8:10], value[11:13], value[14:16], value[17:19])
+    if not b''.join(fields).isdigit():
+        return None
+
+    year, month, day, hour, minute, second = map(int, fields)
+    if not 1 <= month <= 12 or year < 1:
+        return None
+    leap_day = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if not 1 <= day <= DAYS_IN_MONTH[month - 1] + leap_day or hour > 23 or minute > 59 or second > 59:
+        return None
+
+    return f"{year:04d}-{month:02d}-{day:02d}_{hour:02d}-{minute:02d}-{second:02d}"
+
+
+def parse_core_xml_date(core_xml):
+    """Parse dcterms:modified from the bytes of docProps/core.xml"""
+    import xml.etree.ElementTree as ET
+    from datetime import datetime
+
+    try:
+        # Bytes, so the parser honours the encoding declaration
+        root = ET.fromstring(core_xml)
+
+        # Define namespace
+        namespaces = {
+            'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
+            'dcterms': 'http://purl.org/dc/terms/'
+        }
+
+        # Search for Last Modified Date
+        modified_elem = root.find('.//dcterms:modified', namespaces)
+        if modified_elem is not None and modified_elem.text:
+            # Parse ISO 8601 format: 2024-01-15T14:30:22Z
+            date_str = modified_elem.text.replace('Z', '+00:00')
+            date_obj = datetime.fromisoformat(date_str)
+            return date_obj.strftime("%Y-%m-%d_%H-%M-%S")
 
     except Exception:
         pass
@@ -237,29 +661,195 @@ def get_office_xml_date(file_path):
 
 
 def get_ole_document_date(file_path):
-    """Try to extract Last Saved Date from OLE documents (simplified)"""
+    """Extract Last Saved Date from OLE documents (.doc/.xls/.ppt)
+
+    Reads PIDSI_LASTSAVE_DTM from the SummaryInformation stream. Files
+    whose compound file structure is damaged fall back to a heuristic
+    FILETIME scan (scan_ole_filetime).
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            filetime = read_ole_last_saved(f)
+        date_name = filetime_to_name(filetime)
+        if date_name:
+            return date_name
+
+    except Exception:
+        pass
+
+    return scan_ole_filetime(file_path)
+
+
+def filetime_to_name(filetime):
+    """Format a FILETIME as a file name, None if outside 2000-2038"""
+    # FILETIME = 100-nanoseconds since January 1, 1601
+    if not filetime or filetime <= FILETIME_UNIX_EPOCH:
+        return None
+
+    unix_timestamp = (filetime - FILETIME_UNIX_EPOCH) / 10000000
+    if 946684800 < unix_timestamp < 2147483647:  # 2000-2038
+        from datetime import datetime
+        date_obj = datetime.fromtimestamp(unix_timestamp)
+        return date_obj.strftime("%Y-%m-%d_%H-%M-%S")
+
+    return None
+
+
+def read_ole_last_saved(f):
+    """Return PIDSI_LASTSAVE_DTM of the OLE file f as FILETIME, or None"""
+    ole = CompoundFile(f)
+    entry = ole.find_entry('\x05SummaryInformation')
+    if entry is None:
+        return None
+    return parse_property_filetime(ole.read_stream(entry), PIDSI_LASTSAVE_DTM)
+
+
+def parse_property_filetime(data, property_id):
+    """Read a VT_FILETIME property from the first set of a property set stream"""
+    # PropertySetStream header: byte order, version, system id, CLSID,
+    # number of sets, then FMTID and offset of the first set
+    if len(data) < 48 or data[:2] != b'\xFE\xFF':
+        return None
+
+    set_offset = struct.unpack_from('<L', data, 44)[0]
+    _, property_count = struct.unpack_from('<2L', data, set_offset)
+
+    for i in range(property_count):
+        pid, offset = struct.unpack_from('<2L', data, set_offset + 8 + 8 * i)
+        if pid == property_id:
+            value_type = struct.unpack_from('<H', data, set_offset + offset)[0]
+            if value_type != VT_FILETIME:
+                return None
+            return struct.unpack_from('<Q', data, set_offset + offset + 4)[0]
+
+    return None
+
+
+class CompoundFile:
+    """Minimal Compound File Binary (OLE2) reader
+
+    Only reads the sectors it needs: the header, the directory sectors up
+    to the requested entry, the FAT/MiniFAT sectors of the followed chains
+    and the stream sectors themselves.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        header = f.read(512)
+        if len(header) < 512 or not header.startswith(OLE_SIGNATURE):
+            raise ValueError("Not a compound file")
+
+        sector_shift, mini_sector_shift = struct.unpack_from('<2H', header, 30)
+        if not 7 <= sector_shift <= 16 or mini_sector_shift >= sector_shift:
+            raise ValueError("Bad sector size")
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+
+        (fat_count, self.first_dir_sector, _, self.mini_cutoff,
+         self.first_minifat_sector, _, first_difat_sector,
+         difat_count) = struct.unpack_from('<8L', header, 44)
+
+        # FAT sector locations: 109 in the header, the rest in the DIFAT chain
+        self.fat_sectors = list(struct.unpack_from('<109L', header, 76))[:fat_count]
+        per_sector = self.sector_size // 4 - 1
+        difat_sector = first_difat_sector
+        for _ in range(difat_count):
+            if len(self.fat_sectors) >= fat_count or difat_sector >= OLE_MAX_REGULAR_SECTOR:
+                break
+            entries = struct.unpack('<%dL' % (per_sector + 1), self._read_sector(difat_sector))
+            self.fat_sectors.extend(entries[:per_sector])
+            difat_sector = entries[per_sector]
+        del self.fat_sectors[fat_count:]
+
+        self._fat_cache = {}
+        self._minifat = None
+        self._root = None
+
+    def _read_sector(self, sector):
+        self.f.seek((sector + 1) * self.sector_size)
+        data = self.f.read(self.sector_size)
+        if len(data) < self.sector_size:
+            raise ValueError("Truncated compound file")
+        return data
+
+    def _next_sector(self, sector):
+        per_sector = self.sector_size // 4
+        index, position = divmod(sector, per_sector)
+        table = self._fat_cache.get(index)
+        if table is None:
+            table = struct.unpack('<%dL' % per_sector, self._read_sector(self.fat_sectors[index]))
+            self._fat_cache[index] = table
+        return table[position]
+
+    def _chain(self, start):
+        """Yield the sector numbers of the FAT chain starting at start"""
+        sector = start
+        for _ in range(OLE_MAX_CHAIN):
+            if sector >= OLE_MAX_REGULAR_SECTOR:
+                return
+            yield sector
+            sector = self._next_sector(sector)
+        raise ValueError("FAT chain loop")
+
+    def _entries(self):
+        """Yield (name, type, start sector, size) for each directory entry"""
+        for sector in self._chain(self.first_dir_sector):
+            data = self._read_sector(sector)
+            for offset in range(0, self.sector_size, 128):
+                entry = data[offset:offset + 128]
+                name_len = struct.unpack_from('<H', entry, 64)[0]
+                name = entry[:max(name_len - 2, 0)].decode('utf-16-le', 'replace')
+                entry_type = entry[66]
+                start, size = struct.unpack_from('<2L', entry, 116)
+                yield name, entry_type, start, size
+
+    def find_entry(self, name):
+        """Return the directory entry of the stream called name, or None"""
+        for entry in self._entries():
+            if entry[1] == OLE_ROOT_ENTRY and self._root is None:
+                self._root = entry
+            elif entry[1] == OLE_STREAM_ENTRY and entry[0] == name:
+                return entry
+        return None
+
+    def read_stream(self, entry):
+        """Read the contents of a stream directory entry"""
+        _, _, start, size = entry
+        if size < self.mini_cutoff and self._root is not None:
+            return self._read_mini_stream(start, size)
+
+        data = b''.join(self._read_sector(sector) for sector in self._chain(start))
+        return data[:size]
+
+    def _read_mini_stream(self, start, size):
+        """Read a small stream from the mini stream held by the root entry"""
+        if self._minifat is None:
+            self._minifat = b''.join(self._read_sector(sector)
+                                     for sector in self._chain(self.first_minifat_sector))
+            self._root_sectors = list(self._chain(self._root[2]))
+
+        chunks = []
+        mini_sector = start
+        per_sector = self.sector_size // self.mini_sector_size
+        while mini_sector < OLE_MAX_REGULAR_SECTOR and len(chunks) * self.mini_sector_size < size:
+            index, position = divmod(mini_sector, per_sector)
+            self.f.seek((self._root_sectors[index] + 1) * self.sector_size
+                        + position * self.mini_sector_size)
+            chunks.append(self.f.read(self.mini_sector_size))
+            mini_sector = struct.unpack_from('<L', self._minifat, mini_sector * 4)[0]
+
+        return b''.join(chunks)[:size]
+
+
+def scan_ole_filetime(file_path):
+    """Heuristically find the Last Saved FILETIME in the first 8 KB of a file"""
     try:
         with open(file_path, 'rb') as f:
-            # Skip OLE header and search for metadata
-            f.seek(0)
             data = f.read(8192)  # Read first 8KB
 
-            # Search for FILETIME structures (8 bytes, Windows time format)
-            # This is a simplified heuristic
-            for i in range(len(data) - 8):
-                try:
-                    # Read FILETIME as 64-bit integer
-                    filetime = struct.unpack('<Q', data[i:i + 8])[0]
-
-                    # Convert FILETIME to Unix timestamp
-                    # FILETIME = 100-nanoseconds since January 1, 1601
-                    if filetime > 116444736000000000:  # Reasonable range
-                        unix_timestamp = (filetime - 116444736000000000) / 10000000
-                        if 946684800 < unix_timestamp < 2147483647:  # 2000-2038
-                            date_obj = datetime.fromtimestamp(unix_timestamp)
-                            return date_obj.strftime("%Y-%m-%d_%H-%M-%S")
-                except:
-                    continue
+        candidates = find_filetime_candidates(data)
+        if candidates:
+            return filetime_to_name(rank_filetime_candidates(data, candidates)[0][1])
 
     except Exception:
         pass
@@ -267,6 +857,93 @@ def get_ole_document_date(file_path):
     return None
 
 
+def find_filetime_candidates(data):
+    """Return (offset, filetime) for every plausible FILETIME in data
+
+    Any FILETIME between 2000 and 2038 has 0x01 as its most significant
+    byte and 0xBF-0xEA below it, so a regex finds the few possible offsets
+    (at all 8 byte alignments) at C speed before anything is unpacked.
+    """
+    import re
+
+    candidates = []
+    # re keeps the compiled pattern cached between calls
+    for match in re.compile(FILETIME_PREFILTER).finditer(data, 6):
+        offset = match.start() - 6
+        filetime = struct.unpack_from('<Q', data, offset)[0]
+        if FILETIME_MIN < filetime < FILETIME_MAX:
+            candidates.append((offset, filetime))
+    return candidates
+
+
+def rank_filetime_candidates(data, candidates):
+    """Order FILETIME candidates from most to least likely Last Saved Date
+
+    Values stored as a typed VT_FILETIME property come first, then values
+    at property-aligned (4 byte) offsets; ties go to the most recent time,
+    as the last save is usually the latest timestamp in a document.
+    """
+    def score(candidate):
+        offset, filetime = candidate
+        typed = data[offset - 4:offset] == VT_FILETIME_TAG
+        return typed, offset % 4 == 0, filetime
+
+    return sorted(candidates, key=score, reverse=True)
+
+
+def is_empty_file(file_path, header=None):
+    """Check if a file is empty, entirely sparse or filled with zeros
+
+    A header with any non-zero byte answers immediately. Otherwise only
+    the allocated regions are checked (SEEK_DATA/SEEK_HOLE where the OS
+    supports them), comparing mmap chunks against a zero block.
+    """
+    if header is not None and header.strip(b'\x00'):
+        return False
+
+    with open(file_path, 'rb') as f:
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return True
+
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in _data_regions(fd, size):
+                if not _all_zeros(mm, start, end):
+                    return False
+
+    return True
+
+
+def _all_zeros(buf, start, end):
+    """Check if buf[start:end] holds only zero bytes, one chunk at a time"""
+    for pos in range(start, end, ZERO_CHUNK_SIZE):
+        chunk = buf[pos:min(pos + ZERO_CHUNK_SIZE, end)]
+        if chunk != ZERO_CHUNK[:len(chunk)]:
+            return False
+    return True
+
+
+def _data_regions(fd, size):
+    """Yield (start, end) of the allocated regions of a file"""
+    if not hasattr(os, 'SEEK_DATA'):
+        yield 0, size
+        return
+
+    pos = 0
+    while pos < size:
+        try:
+            start = os.lseek(fd, pos, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:  # Only holes after pos
+                return
+            # Not supported by this file system
+            yield pos, size
+            return
+        pos = os.lseek(fd, start, os.SEEK_HOLE)
+        yield start, pos
+
+
 def get_file_date(file_path, file_ext):
     """Determine Date Last Saved only for Office documents"""
     # Use Date Last Saved only for Office documents
@@ -279,6 +956,1440 @@ def get_file_date(file_path, file_ext):
     return None
 
 
+def analyze_chk_file(file_path, header=None, cache=None):
+    """Detect type and Date Last Saved of a .chk file
+
+    Returns (ext, date, error, timings), timings being a dict of the
+    seconds spent per stage ('read', 'cache', 'empty', 'classify', 'text',
+    'zip', 'date' where they ran, and 'analyze' in total); see
+    PipelineStats. Empty and all-zero files are reported with EMPTY_TYPE
+    as the type before any other check. With a ClassificationCache,
+    unchanged files are answered from the cache and new results are
+    stored in it.
+    """
+    timings = {}
+    started = time.perf_counter()
+    try:
+        new_ext, date_name = _analyze(file_path, header, cache, timings)
+        error = None
+    except Exception as e:
+        new_ext, date_name, error = None, None, str(e)
+    timings['analyze'] = time.perf_counter() - started
+    return new_ext, date_name, error, timings
+
+
+def _analyze(file_path, header, cache, timings):
+    clock = time.perf_counter
+    if header is None:
+        started = clock()
+        header = read_header(file_path)
+        timings['read'] = clock() - started
+
+    key = None
+    if cache is not None:
+        started = clock()
+        key = cache.make_key(file_path, header)
+        cached = cache.get(key)
+        timings['cache'] = clock() - started
+        if cached is not None:
+            return cached
+
+    is_empty = False
+    if not header.strip(b'\x00'):
+        started = clock()
+        is_empty = is_empty_file(file_path)
+        timings['empty'] = clock() - started
+
+    if is_empty:
+        new_ext, date_name = EMPTY_TYPE, None
+    else:
+        started = clock()
+        new_ext, date_name = classify_file(file_path, header, timings=timings)
+        timings['classify'] = clock() - started
+        # ZIP-based Office dates come with the classification
+        if new_ext and new_ext not in OFFICE_XML_EXTENSIONS:
+            started = clock()
+            date_name = get_file_date(file_path, new_ext)
+            timings['date'] = clock() - started
+
+    if key is not None:
+        cache.put(key, new_ext, date_name)
+    return new_ext, date_name
+
+
+def analyze_chk_batch(file_paths, cache=None):
+    """Analyze a batch of .chk files (one process pool task)"""
+    results = [analyze_chk_file(file_path, cache=cache) for file_path in file_paths]
+    if cache is not None:
+        cache.flush()
+    return results
+
+
+class ClassificationCache:
+    """Persistent cache of analyze_chk_file results in an SQLite database
+
+    Entries are keyed by device, inode, size, modification time and a hash
+    of the file header, so a file is only classified again when it has
+    changed. The database runs in WAL mode, letting process pool workers
+    read and write it concurrently. Once it holds more than max_entries
+    results, the oldest entries are evicted.
+    """
+
+    def __init__(self, path, max_entries=CACHE_MAX_ENTRIES):
+        import sqlite3
+
+        self.path = path
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS results '
+                        '(key TEXT PRIMARY KEY, ext TEXT, date TEXT)')
+        self.db.commit()
+        self._pending = 0
+
+    def __reduce__(self):
+        # Worker processes open their own connection to the same database
+        return _open_worker_cache, (self.path, self.max_entries)
+
+    @staticmethod
+    def make_key(file_path, header):
+        """Build the cache key of a file from its stat data and header"""
+        import hashlib
+
+        st = os.stat(file_path)
+        header_hash = hashlib.blake2b(header, digest_size=16).hexdigest()
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{header_hash}"
+
+    def get(self, key):
+        """Return the cached (ext, date) for key, or None"""
+        import sqlite3
+
+        try:
+            row = self.db.execute('SELECT ext, date FROM results WHERE key = ?',
+                                  (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return tuple(row) if row else None
+
+    def put(self, key, ext, date_name):
+        """Store a result; written to disk in batches by flush()"""
+        import sqlite3
+
+        try:
+            self.db.execute('INSERT OR REPLACE INTO results (key, ext, date) VALUES (?, ?, ?)',
+                            (key, ext, date_name))
+        except sqlite3.Error:
+            return
+        self._pending += 1
+        if self._pending >= CACHE_COMMIT_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Commit pending results and evict the oldest beyond max_entries
+
+        Errors of a locked or full database are ignored, as in get() and
+        put(): the cache is optional and never fails a recovery.
+        """
+        import sqlite3
+
+        if not self._pending:
+            return
+        try:
+            self.db.execute('DELETE FROM results WHERE rowid <= '
+                            '(SELECT MAX(rowid) FROM results) - ?', (self.max_entries,))
+            self.db.commit()
+        except sqlite3.Error:
+            pass
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+_worker_caches = {}
+
+
+def _open_worker_cache(path, max_entries):
+    """Open (once per process) the cache handed to a process pool worker"""
+    cache = _worker_caches.get(path)
+    if cache is None:
+        cache = _worker_caches[path] = ClassificationCache(path, max_entries)
+    return cache
+
+
+def _batched(iterable, size):
+    """Split iterable into lists of at most size items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bounded_map(executor, fn, iterable, depth):
+    """Like executor.map, but in order with at most depth tasks in flight"""
+    from collections import deque
+
+    pending = deque()
+    for item in iterable:
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def _prefetch_header(file_path):
+    """Read a header for the prefetch pool; errors surface in detection"""
+    try:
+        return file_path, read_header(file_path)
+    except OSError:
+        return file_path, None
+
+
+def iter_headers(file_paths, prefetch):
+    """Yield (path, header) pairs, reading up to prefetch headers ahead
+
+    A small thread pool overlaps the open()/read() latency of slow disks
+    (USB, network shares) with classification in the caller. At most
+    prefetch headers are held in memory at any time.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(prefetch, MAX_PREFETCH_THREADS)) as executor:
+        yield from _bounded_map(executor, _prefetch_header, file_paths, prefetch)
+
+
+def iter_analysis(file_paths, workers=1, prefetch=0, cache=None, batch_size=64):
+    """Yield analyze_chk_file results for file_paths in input order"""
+    if workers <= 1:
+        if prefetch > 0:
+            for file_path, header in iter_headers(file_paths, prefetch):
+                yield analyze_chk_file(file_path, header, cache)
+        else:
+            for file_path in file_paths:
+                yield analyze_chk_file(file_path, cache=cache)
+        if cache is not None:
+            cache.flush()
+        return
+
+    # Batches keep the per-task pickling overhead low; the bounded queue
+    # keeps memory flat on huge folders
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = _batched(file_paths, batch_size)
+        analyze = partial(analyze_chk_batch, cache=cache)
+        for results in _bounded_map(executor, analyze, batches, workers * 2):
+            yield from results
+
+
+def recover_chk_file(full_path, new_ext, date_name=None, index=None, dry_run=False,
+                     journal=None):
+    """Rename a .chk file to its recovered name and return the new path
+
+    index is the NameIndex of the file's folder; without one, the folder
+    is scanned for this call. With dry_run, the name is only reserved in
+    the index and the file is not renamed. The rename is recorded in the
+    RecoveryJournal journal if one is given.
+    """
+    folder = os.path.dirname(full_path)
+    if index is None:
+        index = NameIndex(folder)
+
+    base = recovered_base(full_path, date_name)
+    while True:
+        new_path = os.path.join(folder, index.reserve(base, new_ext))
+        if dry_run:
+            return new_path
+        try:
+            journaled_rename(full_path, new_path, journal)
+            return new_path
+        except FileExistsError:
+            # Created behind our back; the name is marked taken, try the next
+            continue
+
+
+def copy_chk_file(full_path, new_ext, date_name, output_dir, index=None, trim=False,
+                  dry_run=False, journal=None):
+    """Copy a .chk file under its recovered name into output_dir
+
+    The .chk file itself is left untouched. index is the NameIndex of
+    output_dir. With trim, only the bytes up to the true end of the file
+    are copied (see true_file_size). Returns the new path and the number
+    of slack bytes left out; with dry_run, nothing is copied.
+
+    The copy is written to a hidden .partial file and only renamed to its
+    recovered name when complete, so an interrupted copy never appears
+    as a recovered file. With a journal, the copy is synced to disk and
+    recorded as a 'plan' with copy=True before it is renamed.
+    """
+    if index is None:
+        index = NameIndex(output_dir)
+
+    base = recovered_base(full_path, date_name)
+    with open(full_path, 'rb') as src:
+        size = os.fstat(src.fileno()).st_size
+        length = true_file_size(src, new_ext) if trim else size
+        if dry_run:
+            return os.path.join(output_dir, index.reserve(base, new_ext)), size - length
+
+        # Left over by an interrupted run if it exists; copied anew
+        temp_path = os.path.join(output_dir, f".{os.path.basename(full_path)}.partial")
+        dst_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+                         | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            try:
+                copy_file_data(src.fileno(), dst_fd, length)
+                if journal is not None:
+                    os.fsync(dst_fd)
+            finally:
+                os.close(dst_fd)
+
+            while True:
+                new_path = os.path.join(output_dir, index.reserve(base, new_ext))
+                if journal is not None:
+                    journal.record('plan', full_path, new_path, copy=True)
+                try:
+                    rename_no_replace(temp_path, new_path)
+                    break
+                except FileExistsError:
+                    continue
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    return new_path, size - length
+
+
+def recovered_base(full_path, date_name=None):
+    """Return the recovered file name of a .chk file without extension"""
+    if date_name:
+        return date_name
+    # For PDF, images etc.: use original name without .chk
+    return os.path.splitext(os.path.basename(full_path))[0]
+
+
+class NameIndex:
+    """In-memory index of the names taken in a directory
+
+    Filled by one os.scandir of the directory, it hands out free
+    recovered names (name.ext, name_001.ext, ...) without an
+    os.path.exists probe per candidate, and remembers the next suffix per
+    base name. Names are compared case-insensitively, as on the NTFS and
+    FAT volumes chkdsk works on.
+    """
+
+    def __init__(self, folder):
+        try:
+            with os.scandir(folder) as entries:
+                self.taken = {entry.name.casefold() for entry in entries}
+        except FileNotFoundError:
+            # An output directory that is only created later
+            self.taken = set()
+        self.next_suffix = {}
+
+    def reserve(self, base, ext):
+        """Return a free name for base + ext and mark it as taken"""
+        key = (base.casefold(), ext.casefold())
+        counter = self.next_suffix.get(key, 0)
+
+        name = base + ext
+        if counter == 0 and name.casefold() in self.taken:
+            counter = 1
+        if counter:
+            while f"{base}_{counter:03d}{ext}".casefold() in self.taken:
+                counter += 1
+            name = f"{base}_{counter:03d}{ext}"
+
+        self.taken.add(name.casefold())
+        self.next_suffix[key] = counter + 1
+        return name
+
+
+def journaled_rename(src, dst, journal=None):
+    """rename_no_replace, recorded as planned and done in the journal"""
+    if journal is None:
+        rename_no_replace(src, dst)
+        return
+
+    journal.record('plan', src, dst)
+    rename_no_replace(src, dst)
+    journal.record('done', src, dst)
+
+
+def rename_no_replace(src, dst, src_dir_fd=None, dst_dir_fd=None):
+    """Rename src to dst, raising FileExistsError instead of overwriting dst
+
+    src and dst may be relative to the directory descriptors src_dir_fd
+    and dst_dir_fd (not on Windows).
+    """
+    if os.name == 'nt':
+        # Windows never replaces an existing file in os.rename
+        os.rename(src, dst)
+        return
+
+    try:
+        os.link(src, dst, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+    except FileExistsError:
+        raise
+    except OSError:
+        # No hard links on this file system (FAT, exFAT)
+        try:
+            os.stat(dst, dir_fd=dst_dir_fd, follow_symlinks=False)
+        except FileNotFoundError:
+            os.rename(src, dst, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+            return
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+    os.unlink(src, dir_fd=src_dir_fd)
+
+
+def copy_file_data(src_fd, dst_fd, length):
+    """Copy the first length bytes of file src_fd into the empty file dst_fd
+
+    Tries a reflink clone that shares the data blocks (FICLONE on Btrfs,
+    XFS), then in-kernel copies (copy_file_range, sendfile) and finally a
+    buffered copy, each continuing where the previous one stopped.
+    """
+    if fcntl is not None and sys.platform.startswith('linux'):
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            if length < os.fstat(src_fd).st_size:
+                os.ftruncate(dst_fd, length)
+            return
+        except OSError:
+            pass
+
+    offset = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while offset < length:
+                copied = os.copy_file_range(src_fd, dst_fd, length - offset, offset, offset)
+                if not copied:
+                    break
+                offset += copied
+        except OSError:
+            pass
+
+    if offset < length and hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        try:
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            while offset < length:
+                copied = os.sendfile(dst_fd, src_fd, offset, length - offset)
+                if not copied:
+                    break
+                offset += copied
+        except OSError:
+            pass
+
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while offset < length:
+        chunk = os.read(src_fd, min(COPY_CHUNK_SIZE, length - offset))
+        if not chunk:
+            break
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(dst_fd, view):]
+        offset += len(chunk)
+
+
+class RecoveryJournal:
+    """Append-only JSON Lines journal of a recovery run
+
+    Each rename is recorded as 'plan' before and 'done' after it happens;
+    other processed files are recorded as 'seen'. Every record is handed
+    to the OS immediately, so a crash of the program loses nothing, while
+    fsync is batched to every JOURNAL_SYNC_INTERVAL records or
+    JOURNAL_SYNC_SECONDS, which bounds what a power failure can lose.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, 'a+', encoding='utf-8')
+        # Terminate a line torn by a crash so the next record stays readable
+        if self.f.tell():
+            self.f.seek(self.f.tell() - 1)
+            if self.f.read(1) != "\n":
+                self.f.write("\n")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, op, src, dst=None, **fields):
+        """Append one record"""
+        import json
+
+        record = {'op': op, 'src': src}
+        if dst is not None:
+            record['dst'] = dst
+        record.update(fields)
+        self.f.write(json.dumps(record) + "\n")
+        self.f.flush()
+
+        self._unsynced += 1
+        if (self._unsynced >= JOURNAL_SYNC_INTERVAL
+                or time.monotonic() - self._last_sync >= JOURNAL_SYNC_SECONDS):
+            self.sync()
+
+    def sync(self):
+        """Force the records written so far to disk"""
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self.f.closed:
+            self.sync()
+            self.f.close()
+
+
+def read_journal(path):
+    """Yield the records of a journal or plan, skipping a torn last line"""
+    import json
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def resume_journal(journal):
+    """Replay a journal and return the set of source paths already handled
+
+    Renames that were planned but not confirmed are checked on disk: if
+    the source is gone and the target exists, the rename happened and is
+    recorded as done now; otherwise the file is processed again. A rename
+    torn between link and unlink (see rename_no_replace) leaves source and
+    target as the same file; the source is then unlinked to complete it.
+    A planned copy into an output folder (see copy_chk_file) is complete
+    if its target exists. Files that ended in an error are processed
+    again as well.
+    """
+    planned = {}
+    handled = set()
+    for record in read_journal(journal.path):
+        op, src = record['op'], record['src']
+        if op == 'plan':
+            planned[src] = record
+        elif op == 'done':
+            planned.pop(src, None)
+            handled.add(src)
+        elif op == 'seen':
+            planned.pop(src, None)
+            if record.get('status') != 'error':
+                handled.add(src)
+        elif op == 'undone':
+            handled.discard(src)
+
+    for src, record in planned.items():
+        dst = record['dst']
+        if record.get('copy'):
+            if os.path.lexists(dst):
+                journal.record('seen', src, status='recovered')
+                handled.add(src)
+            continue
+
+        try:
+            if os.path.lexists(src) and os.path.samefile(src, dst):
+                os.unlink(src)
+        except OSError:
+            pass
+
+        if not os.path.lexists(src) and os.path.lexists(dst):
+            journal.record('done', src, dst)
+            handled.add(src)
+
+    return handled
+
+
+def undo_journal(path):
+    """Reverse the completed renames of a journal, newest first
+
+    Returns (undone, failed). Reversed renames are recorded as 'undone',
+    so running the undo again only retries the failed ones. Trimmed
+    slack and carved pieces are not restored.
+    """
+    done = []
+    undone = set()
+    for record in read_journal(path):
+        if record['op'] == 'done':
+            done.append((record['src'], record['dst']))
+        elif record['op'] == 'undone':
+            undone.add((record['src'], record['dst']))
+
+    count_undone = 0
+    count_failed = 0
+    with RecoveryJournal(path) as journal:
+        for src, dst in reversed(done):
+            if (src, dst) in undone:
+                continue
+            try:
+                rename_no_replace(dst, src)
+                journal.record('undone', src, dst)
+                count_undone += 1
+            except OSError:
+                count_failed += 1
+
+    return count_undone, count_failed
+
+
+def iter_chk_entries(folder):
+    """Yield the os.DirEntry of each .chk file in folder as it is read
+
+    A single streaming os.scandir pass: work can start on the first files
+    before the directory has been read to the end, and the file type
+    comes from the directory entry without an extra stat.
+    """
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith('.chk') and entry.is_file():
+                yield entry
+
+
+def list_chk_files(folder):
+    """Return the names of all .chk files in folder"""
+    return [entry.name for entry in iter_chk_entries(folder)]
+
+
+def make_result(full_path, analysis, trim=False, empty_dir=None, index=None,
+                dry_run=False, journal=None, output_dir=None):
+    """Rename a .chk file from its analysis and return its result dict
+
+    With output_dir the file is copied there instead; with dry_run nothing
+    is changed on disk. index is the NameIndex used to pick free names.
+    """
+    new_ext, date_name, error, timings = analysis
+    result = {
+        'path': full_path,
+        'file': os.path.basename(full_path),
+        'status': 'unknown',
+        'ext': new_ext,
+        'date': date_name,
+        'new_name': None,
+        'duplicate_of': None,
+        'trimmed': 0,
+        'error': error,
+        'timings': dict(timings),
+    }
+
+    started = time.perf_counter()
+    try:
+        if error:
+            raise RuntimeError(error)
+
+        if new_ext == EMPTY_TYPE:
+            result['ext'] = None
+            result['status'] = 'empty'
+            if empty_dir and not dry_run and not output_dir:
+                target_dir = os.path.join(os.path.dirname(full_path), empty_dir)
+                os.makedirs(target_dir, exist_ok=True)
+                journaled_rename(full_path, os.path.join(target_dir, result['file']), journal)
+        elif new_ext and output_dir:
+            new_path, result['trimmed'] = copy_chk_file(full_path, new_ext, date_name,
+                                                        output_dir, index, trim, dry_run,
+                                                        journal)
+            result['new_name'] = os.path.basename(new_path)
+            result['status'] = 'recovered'
+        elif new_ext:
+            new_path = recover_chk_file(full_path, new_ext, date_name, index, dry_run,
+                                        journal)
+            result['new_name'] = os.path.basename(new_path)
+            result['status'] = 'recovered'
+            if trim and not dry_run:
+                result['trimmed'] = trim_file(new_path, new_ext)
+
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+
+    result['timings']['rename'] = time.perf_counter() - started
+    return result
+
+
+def make_duplicate_result(full_path, original, link=False, index=None, dry_run=False,
+                          journal=None, output_dir=None):
+    """Describe a duplicate .chk file, optionally hardlinking it
+
+    original is the result of the identical file processed earlier. With
+    link, the duplicate is replaced by a hardlink to the recovered
+    original; otherwise it is left untouched with status 'duplicate'.
+    With output_dir, the hardlink is made next to the copy of the original
+    and the duplicate itself is kept. Nothing is linked with dry_run.
+    """
+    result = {
+        'path': full_path,
+        'file': os.path.basename(full_path),
+        'status': 'duplicate',
+        'ext': original['ext'],
+        'date': original['date'],
+        'new_name': None,
+        'duplicate_of': original['file'],
+        'trimmed': 0,
+        'error': None,
+        'timings': {},
+    }
+
+    if link and original['status'] == 'recovered' and not dry_run:
+        try:
+            folder = output_dir or os.path.dirname(full_path)
+            if index is None:
+                index = NameIndex(folder)
+
+            base = recovered_base(full_path, original['date'])
+            while True:
+                new_path = os.path.join(folder, index.reserve(base, original['ext']))
+                try:
+                    if journal is not None and not output_dir:
+                        journal.record('plan', full_path, new_path)
+                    os.link(os.path.join(folder, original['new_name']), new_path)
+                    break
+                except FileExistsError:
+                    continue
+            if not output_dir:
+                os.unlink(full_path)
+                if journal is not None:
+                    journal.record('done', full_path, new_path)
+            result['new_name'] = os.path.basename(new_path)
+            result['status'] = 'recovered'
+
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+
+    return result
+
+
+def _file_digest(file_path, size, partial):
+    """BLAKE2b of a file; with partial, of its first and last DEDUP_BLOCK only"""
+    import hashlib
+
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        if partial and size > 2 * DEDUP_BLOCK:
+            digest.update(f.read(DEDUP_BLOCK))
+            f.seek(-DEDUP_BLOCK, os.SEEK_END)
+            digest.update(f.read(DEDUP_BLOCK))
+        else:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.digest()
+
+
+def _regroup_by_digest(executor, folder, groups, partial):
+    """Split groups of (name, size) by file digest, keeping groups of 2+"""
+    members = [member for group in groups for member in group]
+    digests = executor.map(
+        lambda member: _file_digest(os.path.join(folder, member[0]), member[1], partial),
+        members)
+
+    regrouped = {}
+    for member, digest in zip(members, digests):
+        regrouped.setdefault((member[1], digest), []).append(member)
+    return [group for group in regrouped.values() if len(group) > 1]
+
+
+def find_duplicates(folder, chk_files, threads=DEDUP_THREADS):
+    """Map each duplicate .chk file name to the first identical file
+
+    Files are first grouped by size, so only size collisions are hashed:
+    first by their first and last blocks, then in full where that is not
+    already the whole file. Hashing runs in threads (hashlib releases the
+    GIL). "First" means first in chk_files order.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    by_size = {}
+    for filename in chk_files:
+        size = os.stat(os.path.join(folder, filename)).st_size
+        by_size.setdefault(size, []).append((filename, size))
+    groups = [group for group in by_size.values() if len(group) > 1]
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        groups = _regroup_by_digest(executor, folder, groups, partial=True)
+        small = [group for group in groups if group[0][1] <= 2 * DEDUP_BLOCK]
+        large = [group for group in groups if group[0][1] > 2 * DEDUP_BLOCK]
+        groups = small + _regroup_by_digest(executor, folder, large, partial=False)
+
+    duplicates = {}
+    for group in groups:
+        original = group[0][0]
+        for filename, _ in group[1:]:
+            duplicates[filename] = original
+    return duplicates
+
+
+def _jpeg_end(buf, start, limit):
+    """End of a JPEG, including images and videos appended after its EOI
+
+    MPF previews (another JPEG) and the MP4 of a motion photo directly
+    follow the EOI of the main image; if one cannot be walked to its end,
+    the end of the file is unknown.
+    """
+    end = _jpeg_image_end(buf, start, limit)
+    while end is not None and end < limit:
+        if buf[end:end + 3] == b'\xFF\xD8\xFF':
+            end = _jpeg_image_end(buf, end, limit)
+        elif buf[end + 4:end + 8] == b'ftyp':
+            end = _mp4_end(buf, end, limit)
+        else:
+            break
+    return end
+
+
+def _jpeg_image_end(buf, start, limit):
+    """End of one JPEG image: walk the segments up to SOS, then find EOI"""
+    pos = start + 2
+    while pos + 4 <= limit:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+        elif marker == 0xD9:  # EOI
+            return pos + 2
+        elif 0xD0 <= marker <= 0xD7 or marker == 0x01:  # Markers without length
+            pos += 2
+        else:
+            length = struct.unpack('>H', buf[pos + 2:pos + 4])[0]
+            if marker == 0xDA:
+                # Entropy-coded data escapes 0xFF, so the next FF D9 is EOI
+                eoi = buf.find(b'\xFF\xD9', pos + 2 + length, limit)
+                return eoi + 2 if eoi >= 0 else None
+            pos += 2 + length
+    return None
+
+
+def _png_end(buf, start, limit):
+    """End of a PNG: walk the chunks up to IEND"""
+    pos = start + 8
+    while pos + 12 <= limit:
+        length, chunk_type = struct.unpack('>L4s', buf[pos:pos + 8])
+        pos += 12 + length
+        if chunk_type == b'IEND':
+            return pos
+    return None
+
+
+def _zip_end(buf, start, limit):
+    """End of a ZIP: the first EOCD record that points back to this archive"""
+    pos = buf.find(b'PK\x05\x06', start, limit)
+    while pos >= 0 and pos + ZIP_EOCD_SIZE <= limit:
+        cd_size, cd_offset, comment_len = struct.unpack('<2LH', buf[pos + 12:pos + 22])
+        if start + cd_offset + cd_size == pos:
+            return pos + ZIP_EOCD_SIZE + comment_len
+        pos = buf.find(b'PK\x05\x06', pos + 4, limit)
+    return None
+
+
+def _pdf_end(buf, start, limit):
+    """End of a PDF: the last %%EOF marker plus its line ending"""
+    pos = buf.rfind(b'%%EOF', start, limit)
+    if pos < 0:
+        return None
+    end = pos + 5
+    if buf[end:end + 2] == b'\r\n':
+        return end + 2
+    if buf[end:end + 1] in (b'\r', b'\n'):
+        return end + 1
+    return end
+
+
+def _riff_end(buf, start, limit):
+    """End of a RIFF file (WAV/AVI/WebP) from its chunk sizes
+
+    Follows the RIFF AVIX chunks that extend an OpenDML AVI. A size too
+    small to hold the form type (0 in many cut-off recordings) leaves the
+    end unknown.
+    """
+    end = start
+    while True:
+        size = struct.unpack('<L', buf[end + 4:end + 8])[0]
+        if size < 4:
+            return None
+        end += 8 + size + (size & 1)
+        if buf[end:end + 4] != b'RIFF' or buf[end + 8:end + 12] != b'AVIX':
+            return end
+
+
+def _mp4_end(buf, start, limit):
+    """End of an ISO media file (MP4/MOV): walk the top-level boxes"""
+    pos = start
+    while pos + 8 <= limit:
+        size, box_type = struct.unpack('>L4s', buf[pos:pos + 8])
+        if not all(32 <= b < 127 for b in box_type):
+            break
+        if size == 1:
+            size = struct.unpack('>Q', buf[pos + 8:pos + 16])[0]
+        elif size == 0:  # Box extends to the end of the file
+            return None
+        if size < 8:
+            break
+        pos += size
+    return pos if pos > start else None
+
+
+END_FINDERS = {
+    '.jpg': _jpeg_end,
+    '.png': _png_end,
+    '.pdf': _pdf_end,
+    '.wav': _riff_end, '.avi': _riff_end, '.webp': _riff_end,
+    '.mp4': _mp4_end, '.m4v': _mp4_end, '.mov': _mp4_end,
+}
+for _ext in ('.zip', '.docx', '.xlsx', '.pptx', '.jar', '.apk'):
+    END_FINDERS[_ext] = _zip_end
+
+
+def find_file_end(buf, ext, start=0, limit=None):
+    """Return the true end offset of the ext file starting at start, or None
+
+    buf is bytes or an mmap. The per-format finders only look at record
+    headers and search for end markers, so they never copy the file.
+    None means the format has no finder or its structure was not found
+    before limit.
+    """
+    finder = END_FINDERS.get(ext)
+    if finder is None:
+        return None
+    if limit is None:
+        limit = len(buf)
+
+    try:
+        end = finder(buf, start, limit)
+    except (struct.error, IndexError, ValueError):
+        return None
+    return end if end and start < end <= limit else None
+
+
+def true_file_size(f, ext):
+    """Return the size of an open file without its cluster slack
+
+    The detected end is only used if what follows it looks like slack:
+    all zeros, or less than TRIM_CLUSTER_SIZE bytes. Otherwise the end
+    detection may have missed data, and the full size is returned.
+    """
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        return 0
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = find_file_end(mm, ext)
+        if not end or end >= size:
+            return size
+        if size - end >= TRIM_CLUSTER_SIZE and not _all_zeros(mm, end, size):
+            return size
+    return end
+
+
+def trim_file(file_path, ext):
+    """Cut the cluster slack after the true end of a file; returns bytes cut"""
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = true_file_size(f, ext)
+
+    if end < size:
+        os.truncate(file_path, end)
+        return size - end
+    return 0
+
+
+def build_carving_pattern(signatures, patterns=CARVE_PATTERNS, min_length=CARVE_MIN_SIGNATURE):
+    """Compile one regex alternation over signatures of min_length+ bytes and patterns"""
+    import re
+
+    sigs = sorted((sig for sig in signatures if len(sig) >= min_length),
+                  key=len, reverse=True)
+    return re.compile(b'|'.join([re.escape(sig) for sig in sigs] + list(patterns)))
+
+
+def find_embedded_headers(data, alignment=CARVE_ALIGNMENT):
+    """Return the offsets of file headers in data (bytes or mmap)
+
+    Short signatures (see CARVE_MIN_SIGNATURE) are searched with the
+    longer CARVE_PATTERNS, and only headers at multiples of alignment are
+    accepted: files from lost cluster chains start on a sector boundary,
+    signatures inside file data mostly do not. Where find_file_end knows where a file ends,
+    signatures before that end (ZIP members, embedded thumbnails) are
+    skipped as well.
+    """
+    offsets = []
+    skip_until = 0
+    for match in build_carving_pattern(SIGNATURES).finditer(data):
+        start = match.start()
+        if match.group().startswith(b'ftyp'):
+            # The ftyp box starts 4 bytes before its type
+            start -= 4
+        if start < skip_until or start % alignment or (offsets and offsets[-1] == start):
+            continue
+
+        offsets.append(start)
+        ext = match_signature(match.group())
+        # A PDF's last %%EOF may belong to a later file, so never skip past it
+        if ext != '.pdf':
+            skip_until = find_file_end(data, ext, start) or start
+    return offsets
+
+
+def carve_chk_file(file_path, alignment=CARVE_ALIGNMENT):
+    """Split a .chk file holding several files back to back
+
+    The file is memory-mapped and searched once for all signatures (see
+    find_embedded_headers). If more than one piece is found, each is
+    written as <name>_partNNN.chk next to the original from zero-copy
+    slices of the mapping, and the original is renamed to .chk.carved.
+    Returns the paths of the pieces, or an empty list if nothing was split.
+    If any piece cannot be written, the pieces written so far are removed
+    again and the original is left as it was.
+    """
+    pieces = []
+    try:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return pieces
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offsets = find_embedded_headers(mm, alignment)
+                if offsets[:1] != [0]:
+                    # Leading fragment: the tail of some other file
+                    offsets.insert(0, 0)
+                if len(offsets) < 2:
+                    return pieces
+
+                stem = os.path.splitext(file_path)[0]
+                view = memoryview(mm)
+                try:
+                    for index, (start, end) in enumerate(zip(offsets, offsets[1:] + [size])):
+                        piece_path = f"{stem}_part{index:03d}.chk"
+                        with open(piece_path, 'xb') as out:
+                            pieces.append(piece_path)
+                            for chunk_start in range(start, end, CARVE_CHUNK_SIZE):
+                                out.write(view[chunk_start:min(chunk_start + CARVE_CHUNK_SIZE, end)])
+                finally:
+                    view.release()
+
+        os.rename(file_path, file_path + '.carved')
+
+    except BaseException:
+        for piece_path in pieces:
+            try:
+                os.unlink(piece_path)
+            except OSError:
+                pass
+        raise
+
+    return pieces
+
+
+def carve_chk_files(folder, chk_files, alignment=CARVE_ALIGNMENT):
+    """Carve every .chk file, returning the file list with pieces in place
+
+    The names are read into a list first: the pieces are written into the
+    folder, and a directory scan still running would return them again.
+    """
+    carved = []
+    for filename in list(chk_files):
+        try:
+            pieces = carve_chk_file(os.path.join(folder, filename), alignment)
+        except (OSError, ValueError):
+            pieces = []
+
+        if pieces:
+            carved.extend(os.path.basename(piece) for piece in pieces)
+        else:
+            carved.append(filename)
+    return carved
+
+
+def iter_recovery(folder, chk_files, workers=1, prefetch=0, cache=None, dedupe=None,
+                  carve=False, trim=False, empty_dir=None, dry_run=False, journal=None,
+                  skip=None, output_dir=None):
+    """Recover the given .chk files of folder, yielding one result per file
+
+    The options match the command line options of the same name. skip is
+    a set of paths to leave out, such as those returned by resume_journal.
+    """
+    if skip:
+        chk_files = (filename for filename in chk_files
+                     if os.path.join(folder, filename) not in skip)
+
+    if carve and not dry_run and not output_dir:
+        chk_files = carve_chk_files(folder, chk_files)
+
+    if dedupe:
+        chk_files = list(chk_files)
+        duplicates = find_duplicates(folder, chk_files)
+        if dedupe == 'report':
+            analyzed = chk_files
+        else:
+            analyzed = [filename for filename in chk_files if filename not in duplicates]
+    else:
+        duplicates = {}
+        # The analysis runs a bounded number of files ahead of the renames
+        from itertools import tee
+        chk_files, analyzed = tee(chk_files)
+    originals = dict.fromkeys(duplicates.values())
+
+    if output_dir and not dry_run:
+        os.makedirs(output_dir, exist_ok=True)
+    index = NameIndex(output_dir or folder)
+
+    paths = (os.path.join(folder, filename) for filename in analyzed)
+    analyses = iter_analysis(paths, workers, prefetch, cache)
+
+    for filename in chk_files:
+        full_path = os.path.join(folder, filename)
+        if filename in duplicates and dedupe != 'report':
+            original = originals[duplicates[filename]]
+            result = make_duplicate_result(full_path, original, dedupe == 'hardlink',
+                                           index, dry_run, journal, output_dir)
+        else:
+            result = make_result(full_path, next(analyses), trim, empty_dir, index,
+                                 dry_run, journal, output_dir)
+            result['duplicate_of'] = duplicates.get(filename)
+            if filename in originals:
+                originals[filename] = result
+
+        if (journal is not None and not dry_run
+                and (output_dir or result['status'] != 'recovered')):
+            journal.record('seen', full_path, status=result['status'])
+        yield result
+
+
+def iter_rename_plan(folder, chk_files, workers=1, prefetch=0, cache=None, dedupe=None,
+                     empty_dir=None):
+    """Classify .chk files and yield the renames they need as plan records
+
+    Nothing is changed on disk: as in a dry run, name collisions are
+    resolved in the in-memory NameIndex of the folder. Each record holds
+    the folder, the source name, the destination relative to the folder
+    and the detected extension (see apply_rename_plan).
+    """
+    folder = os.path.abspath(folder)
+    for result in iter_recovery(folder, chk_files, workers, prefetch, cache, dedupe,
+                                empty_dir=empty_dir, dry_run=True):
+        if result['status'] == 'recovered':
+            dst = result['new_name']
+        elif result['status'] == 'empty' and empty_dir:
+            dst = os.path.join(empty_dir, result['file'])
+        else:
+            continue
+        yield {'folder': folder, 'src': result['file'], 'dst': dst, 'ext': result['ext']}
+
+
+def apply_rename_plan(plan_path, trim=False, journal=None):
+    """Execute the renames of a plan written from iter_rename_plan
+
+    No file is analyzed again: the renames run in a tight loop, relative
+    to directory descriptors opened once per directory where the platform
+    supports it. A destination taken since planning is never overwritten
+    and counts as failed. Renames found already done (source gone,
+    destination present) are counted as applied, so a plan can be re-run
+    after an interruption. With trim, the cluster slack of each renamed
+    file is cut off. Returns a dict of counts.
+    """
+    counts = {'renamed': 0, 'applied': 0, 'failed': 0, 'trimmed': 0}
+    use_dir_fd = {os.link, os.unlink, os.stat} <= os.supports_dir_fd
+    dir_fds = {}
+
+    def open_dir(path):
+        if path not in dir_fds:
+            os.makedirs(path, exist_ok=True)
+            dir_fds[path] = None
+            if use_dir_fd:
+                dir_fds[path] = os.open(path, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+        return dir_fds[path]
+
+    try:
+        for record in read_journal(plan_path):
+            src_path = os.path.join(record['folder'], record['src'])
+            dst_path = os.path.join(record['folder'], record['dst'])
+            dst_dir, dst_name = os.path.split(dst_path)
+            try:
+                src_fd = open_dir(record['folder'])
+                dst_fd = open_dir(dst_dir)
+                if journal is not None:
+                    journal.record('plan', src_path, dst_path)
+                if use_dir_fd:
+                    rename_no_replace(record['src'], dst_name, src_fd, dst_fd)
+                else:
+                    rename_no_replace(src_path, dst_path)
+                if journal is not None:
+                    journal.record('done', src_path, dst_path)
+            except OSError:
+                if os.path.lexists(dst_path) and not os.path.lexists(src_path):
+                    counts['applied'] += 1
+                else:
+                    counts['failed'] += 1
+                continue
+
+            counts['renamed'] += 1
+            if trim and record['ext']:
+                try:
+                    counts['trimmed'] += trim_file(dst_path, record['ext'])
+                except Exception:
+                    pass
+    finally:
+        for fd in dir_fds.values():
+            if fd is not None:
+                os.close(fd)
+
+    return counts
+
+
+async def recover_folder(path, *, concurrency=8, executor=None):
+    """Recover all .chk files in path as an async iterator of results
+
+    Blocking work runs in a thread pool with up to concurrency files being
+    analyzed at once; pass a ProcessPoolExecutor as executor to analyze in
+    processes instead. Renames are performed one at a time in directory
+    order, and results are yielded in the same order as make_result dicts.
+    """
+    import asyncio
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import partial
+
+    loop = asyncio.get_running_loop()
+    io_executor = ThreadPoolExecutor(max_workers=concurrency)
+    analysis_executor = executor or io_executor
+    pending = deque()
+
+    async def finish(full_path, future):
+        analysis = await future
+        return await loop.run_in_executor(io_executor, partial(
+            make_result, full_path, analysis, index=index))
+
+    try:
+        chk_files = await loop.run_in_executor(io_executor, list_chk_files, path)
+        index = await loop.run_in_executor(io_executor, NameIndex, path)
+        for filename in chk_files:
+            if len(pending) >= concurrency:
+                yield await finish(*pending.popleft())
+
+            full_path = os.path.join(path, filename)
+            future = loop.run_in_executor(analysis_executor, analyze_chk_file, full_path)
+            pending.append((full_path, future))
+
+        while pending:
+            yield await finish(*pending.popleft())
+
+    finally:
+        for _, future in pending:
+            future.cancel()
+        io_executor.shutdown(wait=False)
+
+
+class PipelineStats:
+    """Counters and latency histograms per pipeline stage and file type
+
+    Latencies are taken from the timings of the results (see
+    analyze_chk_file and make_result), so stages running in process pool
+    workers are measured where they run. Histogram buckets are powers of
+    two in microseconds, which makes recording a value one bit_length().
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.types = {}
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        """Record the timings of one result"""
+        file_type = result['ext'] or result['status']
+        per_type = self.types.get(file_type)
+        if per_type is None:
+            per_type = self.types[file_type] = {'files': 0}
+        per_type['files'] += 1
+
+        for stage, seconds in result['timings'].items():
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = [0, 0.0, 0.0, [0] * HISTOGRAM_BUCKETS]
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+            entry[3][min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+            per_type[stage] = per_type.get(stage, 0.0) + seconds
+
+    def percentile(self, stage, fraction):
+        """Upper bound of the latency below which fraction of a stage's calls fall"""
+        count, _, maximum, buckets = self.stages[stage]
+        seen = 0
+        for bucket, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= fraction * count:
+                return min((1 << bucket) / 1e6, maximum)
+        return maximum
+
+    def to_dict(self):
+        """The statistics as a JSON-serializable dict"""
+        stages = {}
+        for stage, (count, total, maximum, buckets) in self.stages.items():
+            stages[stage] = {
+                'count': count,
+                'total': total,
+                'max': maximum,
+                'p50': self.percentile(stage, 0.5),
+                'p95': self.percentile(stage, 0.95),
+                'p99': self.percentile(stage, 0.99),
+                'histogram_us': {str(1 << bucket): bucket_count
+                                 for bucket, bucket_count in enumerate(buckets)
+                                 if bucket_count},
+            }
+        return {
+            'elapsed': time.perf_counter() - self.started,
+            'stages': stages,
+            'types': self.types,
+        }
+
+    def format_table(self):
+        """Return the summary tables as a list of lines"""
+        lines = [f"{'Stage':<10} {'Calls':>8} {'Total s':>9} {'Mean ms':>9} "
+                 f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Max ms':>8}"]
+        for stage, (count, total, maximum, _) in sorted(
+                self.stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{stage:<10} {count:>8} {total:>9.3f} {total / count * 1e3:>9.3f} "
+                         f"{self.percentile(stage, 0.5) * 1e3:>8.3f} "
+                         f"{self.percentile(stage, 0.95) * 1e3:>8.3f} "
+                         f"{self.percentile(stage, 0.99) * 1e3:>8.3f} {maximum * 1e3:>8.3f}")
+
+        lines.append("")
+        lines.append(f"{'Type':<10} {'Files':>8} {'Analyze s':>10} {'Date s':>9} {'Rename s':>9}")
+        for file_type, per_type in sorted(self.types.items(),
+                                          key=lambda item: -item[1].get('analyze', 0.0)):
+            lines.append(f"{file_type:<10} {per_type['files']:>8} "
+                         f"{per_type.get('analyze', 0.0):>10.3f} "
+                         f"{per_type.get('date', 0.0):>9.3f} "
+                         f"{per_type.get('rename', 0.0):>9.3f}")
+        return lines
+
+
+class ProgressDisplay:
+    """Rate-limited one-line progress display for process_chk_files
+
+    Shows files/s, MB/s, ETA and counts per status and type. It is
+    redrawn in place at most rate times per second on a terminal and
+    written as a new line every PROGRESS_PIPE_INTERVAL seconds otherwise,
+    so the output costs the same for a thousand files as for a million.
+    """
+
+    def __init__(self, stream=None, rate=PROGRESS_RATE):
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty()
+        self.interval = 1 / rate if self.tty else PROGRESS_PIPE_INTERVAL
+        self.started = self.last_render = time.monotonic()
+        self.total = None
+        self.files = 0
+        self.bytes = 0
+        self.statuses = {}
+        self.types = {}
+        self.width = 0
+
+    def update(self, result, size=0):
+        """Count one result and redraw if the refresh interval has passed"""
+        self.files += 1
+        self.bytes += size
+        self.statuses[result['status']] = self.statuses.get(result['status'], 0) + 1
+        if result['ext']:
+            self.types[result['ext']] = self.types.get(result['ext'], 0) + 1
+
+        now = time.monotonic()
+        if now - self.last_render >= self.interval:
+            self.last_render = now
+            self.render(now)
+
+    def format_line(self, now):
+        """Return the progress line"""
+        elapsed = max(now - self.started, 1e-6)
+        rate = self.files / elapsed
+        if self.total:
+            parts = [f"[{self.files}/{self.total}] {self.files / self.total:4.0%}"]
+        else:
+            parts = [f"[{self.files}/?]"]
+        parts.append(f"{rate:,.0f} files/s")
+        parts.append(f"{self.bytes / 1048576 / elapsed:.1f} MB/s")
+        if self.total and rate:
+            remaining = int(max(self.total - self.files, 0) / rate)
+            parts.append(f"ETA {remaining // 3600}:{remaining // 60 % 60:02d}:{remaining % 60:02d}")
+
+        get = self.statuses.get
+        counts = (f"✓ {get('recovered', 0)} ❓ {get('unknown', 0)} ∅ {get('empty', 0)} "
+                  f"❌ {get('error', 0)}")
+        if get('duplicate'):
+            counts += f" ⧉ {get('duplicate')}"
+        parts.append(counts)
+
+        top_types = sorted(self.types.items(), key=lambda item: -item[1])[:PROGRESS_TOP_TYPES]
+        if top_types:
+            parts.append(" ".join(f"{ext} {count}" for ext, count in top_types))
+        return "  ".join(parts)
+
+    def render(self, now=None):
+        line = self.format_line(time.monotonic() if now is None else now)
+        if self.tty:
+            try:
+                columns = os.get_terminal_size(self.stream.fileno()).columns
+            except (OSError, ValueError):
+                columns = 80
+            # ❓ and ❌ take two columns each, the cursor one
+            line = line[:columns - 3]
+            self.stream.write("\r" + line.ljust(self.width))
+            self.width = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def finish(self):
+        """Draw the final state"""
+        self.render()
+        if self.tty:
+            self.stream.write("\n")
+
+
+def format_result_line(result):
+    """Return the per-file log line of a result"""
+    status = result['status']
+    if status == 'recovered':
+        outcome = f"✓ → {result['new_name']}"
+    elif status == 'duplicate':
+        outcome = f"⧉ Duplicate of {result['duplicate_of']}"
+    elif status == 'empty':
+        outcome = "∅ Empty (all zeros)"
+    elif status == 'unknown':
+        outcome = "❓ Unknown format"
+    else:
+        outcome = f"❌ Error: {result['error']}"
+    return f"{result['file']}... {outcome}"
+
+
+def write_stats(stats, path, folder):
+    """Append the statistics of one folder to path as a JSON record"""
+    import json
+
+    record = {'folder': os.path.abspath(folder)}
+    record.update(stats.to_dict())
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + "\n")
+
+
 def get_folder_input():
     """Ask user for folder path"""
     print("INSTRUCTIONS:")
@@ -295,10 +2406,9 @@ def get_folder_input():
 
         # Check if folder exists
         if os.path.exists(folder_path) and os.path.isdir(folder_path):
-            # Check if .chk files are present
-            chk_files = [f for f in os.listdir(folder_path) if f.lower().endswith('.chk')]
-            if chk_files:
-                print(f"✓ Folder found! {len(chk_files)} .chk files detected.")
+            # Check if .chk files are present (the full count is shown later)
+            if next(iter_chk_entries(folder_path), None):
+                print("✓ Folder found! .chk files detected.")
                 print()
                 return folder_path
             else:
@@ -318,77 +2428,379 @@ def get_folder_input():
                 return None
 
 
-def process_chk_files(folder):
-    """Process all .chk files in the specified folder"""
+def iter_sized_names(folder, sizes):
+    """Yield the .chk file names of folder, noting their sizes in sizes"""
+    for entry in iter_chk_entries(folder):
+        try:
+            sizes[entry.name] = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            pass
+        yield entry.name
+
+
+def process_chk_files(folder, workers=1, prefetch=0, cache_path=None, dedupe=None,
+                      carve=False, trim=False, empty_dir=None, dry_run=False,
+                      journal_path=None, resume=False, output_dir=None,
+                      show_stats=False, stats_path=None, quiet=False, log_path=None,
+                      progress_rate=PROGRESS_RATE):
+    """Process all .chk files in the specified folder
+
+    Prints progress and a summary; the options match the command line
+    options of the same name.
+    """
     if not folder:
         return
 
-    print("Starting recovery...")
-    print("-" * 40)
+    if not quiet:
+        print("Starting dry run..." if dry_run else "Starting recovery...")
+        print("-" * 40)
 
     count_success = 0
     count_unknown = 0
     count_error = 0
-
-    chk_files = [f for f in os.listdir(folder) if f.lower().endswith('.chk')]
-    total_files = len(chk_files)
-
-    for i, filename in enumerate(chk_files, 1):
-        print(f"[{i:3d}/{total_files}] {filename}...", end=" ")
-
-        full_path = os.path.join(folder, filename)
-
-        try:
-            # Detect file type
-            new_ext = detect_file_type(full_path)
-            if new_ext:
-                # Use Date Last Saved only for Office documents
-                date_name = get_file_date(full_path, new_ext)
-                if date_name:
-                    new_name = date_name + new_ext
-                else:
-                    # For PDF, images etc.: use original name without .chk
-                    new_name = os.path.splitext(filename)[0] + new_ext
-
-                new_path = os.path.join(folder, new_name)
-
-                # Check if file already exists, add suffix if necessary
-                counter = 1
-                original_new_path = new_path
-                while os.path.exists(new_path):
-                    name_without_ext = os.path.splitext(original_new_path)[0]
-                    new_path = f"{name_without_ext}_{counter:03d}{new_ext}"
-                    counter += 1
-
-                # Rename
-                os.rename(full_path, new_path)
-                print(f"✓ → {os.path.basename(new_path)}")
-                count_success += 1
-            else:
-                print("❓ Unknown format")
-                count_unknown += 1
-
-        except Exception as e:
-            print(f"❌ Error: {str(e)[:30]}...")
+    count_duplicate = 0
+    count_empty = 0
+    bytes_trimmed = 0
+
+    cache = ClassificationCache(cache_path) if cache_path else None
+    journal = RecoveryJournal(journal_path) if journal_path and not dry_run else None
+    skip = None
+    if journal is not None and resume:
+        skip = resume_journal(journal)
+        if not quiet:
+            print(f"↻ Resuming: {len(skip)} files already handled")
+
+    # The progress total comes from one scan made before the first rename;
+    # without a progress display, files are processed while it is read
+    progress = None if quiet else ProgressDisplay(rate=progress_rate)
+    sizes = {}
+    if progress is not None:
+        chk_files = [filename for filename in iter_sized_names(folder, sizes)
+                     if not skip or os.path.join(folder, filename) not in skip]
+        progress.total = len(chk_files)
+    else:
+        chk_files = (entry.name for entry in iter_chk_entries(folder))
+
+    if carve and not dry_run and not output_dir:
+        chk_files = list(chk_files)
+        carved_files = len(chk_files)
+        chk_files = carve_chk_files(folder, chk_files)
+        if progress is not None:
+            print(f"✂ Carving added {len(chk_files) - carved_files} files")
+            progress.total = len(chk_files)
+
+    results = iter_recovery(folder, chk_files, workers, prefetch, cache, dedupe,
+                            trim=trim, empty_dir=empty_dir, dry_run=dry_run,
+                            journal=journal, skip=skip, output_dir=output_dir)
+    stats = PipelineStats() if show_stats or stats_path else None
+    log = (open(log_path, 'a', encoding='utf-8', buffering=LOG_BUFFER_SIZE)
+           if log_path else None)
+
+    total_files = 0
+    for total_files, result in enumerate(results, 1):
+        if stats is not None:
+            stats.add(result)
+        if log is not None:
+            log.write(format_result_line(result) + "\n")
+        if progress is not None:
+            progress.update(result, sizes.pop(result['file'], 0))
+
+        if result['duplicate_of']:
+            count_duplicate += 1
+        bytes_trimmed += result['trimmed']
+
+        if result['status'] == 'recovered':
+            count_success += 1
+        elif result['status'] == 'empty':
+            count_empty += 1
+        elif result['status'] == 'unknown':
+            count_unknown += 1
+        elif result['status'] == 'error':
             count_error += 1
 
+    if progress is not None:
+        progress.finish()
+    if log is not None:
+        log.close()
+    if cache is not None:
+        cache.close()
+    if journal is not None:
+        journal.close()
+
     # Summary
-    print()
+    if not quiet:
+        print()
     print("=" * 50)
     print("FINISHED! Summary:")
     print(f"✓ Successfully recovered:        {count_success}")
     print(f"❓ Unknown formats:              {count_unknown}")
+    print(f"∅ Empty (all zeros):            {count_empty}")
     print(f"❌ Errors:                       {count_error}")
+    if dedupe:
+        print(f"⧉ Duplicates:                   {count_duplicate}")
+    if trim:
+        print(f"✂ Slack trimmed:                {bytes_trimmed / 1048576:.1f} MB")
     print(f"📁 Total processed:              {total_files}")
     print("=" * 50)
 
-    if count_success > 0:
-        print(f"\nThe recovered files can be found in:")
-        print(f"📂 {folder}")
-
+    if show_stats:
+        print()
+        print("\n".join(stats.format_table()))
+    if stats_path:
+        write_stats(stats, stats_path, folder)
 
-def main():
-    """Main program"""
+    if count_success > 0 and not dry_run:
+        print(f"\nThe recovered files can be found in:")
+        print(f"📂 {output_dir or folder}")
+    if log_path:
+        print(f"📝 Details per file: {log_path}")
+
+
+def build_arg_parser():
+    """Command line options for non-interactive batch runs"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Recover .chk files by file signature. Without arguments, "
+                    "the tool asks for the folder interactively.")
+    parser.add_argument('folders', nargs='*', metavar='FOLDER',
+                        help="folder(s) containing .chk files")
+    parser.add_argument('--check', nargs='+', metavar='FILE',
+                        help="print type and date of the given files without renaming")
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help="rename without asking for confirmation")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="show the planned names without changing any file")
+    parser.add_argument('--output-format', choices=('text', 'jsonl'), default='text',
+                        help="'jsonl' writes one JSON record per file to stdout "
+                             "instead of the progress display and summary")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="analyze files in N processes (default: 1)")
+    parser.add_argument('--prefetch', type=int, default=0,
+                        help="read N file headers ahead in threads")
+    parser.add_argument('--cache', metavar='PATH',
+                        help="keep classification results in an SQLite cache")
+    parser.add_argument('--dedupe', choices=('skip', 'hardlink', 'report'),
+                        help="handle byte-identical .chk files: leave them untouched, "
+                             "hardlink them to the original, or only mark them")
+    parser.add_argument('--carve', action='store_true',
+                        help="split .chk files that hold several files")
+    parser.add_argument('--trim', action='store_true',
+                        help="cut cluster slack after the end of recovered files")
+    parser.add_argument('--empty-dir', metavar='DIR',
+                        help="move empty and all-zero .chk files into DIR")
+    parser.add_argument('--journal', metavar='PATH',
+                        help=f"journal all renames to PATH (default: {JOURNAL_NAME} "
+                             f"in the folder, except with --output-dir)")
+    parser.add_argument('--no-journal', action='store_true',
+                        help="do not journal the renames; they cannot be undone")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from its journal")
+    parser.add_argument('--undo', action='store_true',
+                        help="reverse the renames recorded in the journal")
+    parser.add_argument('--plan', metavar='PATH',
+                        help="classify the files and write the planned renames to PATH "
+                             "instead of renaming")
+    parser.add_argument('--apply', metavar='PLAN',
+                        help="execute the renames of a plan written with --plan")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="copy recovered files into DIR instead of renaming them")
+    parser.add_argument('--stats', action='store_true',
+                        help="print the time spent per stage and file type")
+    parser.add_argument('--stats-json', metavar='PATH',
+                        help="append the stage statistics of each folder to PATH as JSON")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="print only the final summary, no progress")
+    parser.add_argument('--log', metavar='PATH',
+                        help="write the outcome of every file to PATH")
+    parser.add_argument('--progress-rate', type=float,
+                        help=f"progress redraws per second (default: {PROGRESS_RATE})")
+    return parser
+
+
+def run_batch(args):
+    """Run a non-interactive recovery for parsed arguments; returns exit code"""
+    import json
+
+    if args.check:
+        return check_files(args.check)
+
+    exit_code = 0
+    options = {
+        'workers': args.workers,
+        'prefetch': args.prefetch,
+        'dedupe': args.dedupe,
+        'carve': args.carve,
+        'trim': args.trim,
+        'empty_dir': args.empty_dir,
+        'dry_run': args.dry_run,
+        'output_dir': args.output_dir,
+    }
+
+    if args.apply:
+        if not args.yes:
+            print(f"The renames planned in {args.apply} will be applied. Continue? (y/n): ",
+                  end="", file=sys.stderr, flush=True)
+            if input().lower() != 'y':
+                print("Operation cancelled.", file=sys.stderr)
+                return 0
+        journal = RecoveryJournal(args.journal) if args.journal else None
+        try:
+            counts = apply_rename_plan(args.apply, args.trim, journal)
+        finally:
+            if journal is not None:
+                journal.close()
+        print(f"✓ {counts['renamed']} renamed, {counts['applied']} already applied, "
+              f"{counts['failed']} failed", file=sys.stderr)
+        if args.trim:
+            print(f"✂ Slack trimmed: {counts['trimmed'] / 1048576:.1f} MB",
+                  file=sys.stderr)
+        return 1 if counts['failed'] else 0
+
+    plan_file = open(args.plan, 'w', encoding='utf-8') if args.plan else None
+
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            print(f"❌ Folder not found: {folder}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        journal_path = args.journal
+        if journal_path is None and not args.no_journal and (
+                args.resume or args.undo or not args.output_dir):
+            journal_path = os.path.join(folder, JOURNAL_NAME)
+
+        if (args.resume or args.undo) and not os.path.exists(journal_path):
+            print(f"❌ No journal found: {journal_path}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        if args.undo:
+            undone, failed = undo_journal(journal_path)
+            print(f"↺ {folder}: {undone} renames undone, {failed} failed", file=sys.stderr)
+            if failed:
+                exit_code = 1
+            continue
+
+        if plan_file is not None:
+            cache = ClassificationCache(args.cache) if args.cache else None
+            chk_files = (entry.name for entry in iter_chk_entries(folder))
+            planned = 0
+            try:
+                for record in iter_rename_plan(folder, chk_files, args.workers, args.prefetch,
+                                               cache, args.dedupe, args.empty_dir):
+                    plan_file.write(json.dumps(record) + "\n")
+                    planned += 1
+            finally:
+                if cache is not None:
+                    cache.close()
+            print(f"📝 {folder}: {planned} renames planned", file=sys.stderr)
+            continue
+
+        if not (args.yes or args.dry_run or args.output_dir):
+            print(f"The .chk files in {folder} will be renamed. Continue? (y/n): ",
+                  end="", file=sys.stderr, flush=True)
+            if input().lower() != 'y':
+                print("Operation cancelled.", file=sys.stderr)
+                continue
+
+        if args.output_format == 'text':
+            process_chk_files(folder, cache_path=args.cache, journal_path=journal_path,
+                              resume=args.resume, show_stats=args.stats,
+                              stats_path=args.stats_json, quiet=args.quiet,
+                              log_path=args.log,
+                              progress_rate=args.progress_rate or PROGRESS_RATE,
+                              **options)
+            continue
+
+        cache = ClassificationCache(args.cache) if args.cache else None
+        journal = RecoveryJournal(journal_path) if journal_path and not args.dry_run else None
+        skip = resume_journal(journal) if journal is not None and args.resume else None
+        stats = PipelineStats() if args.stats or args.stats_json else None
+        chk_files = (entry.name for entry in iter_chk_entries(folder))
+        try:
+            for result in iter_recovery(folder, chk_files, cache=cache, journal=journal,
+                                        skip=skip, **options):
+                sys.stdout.write(json.dumps(result) + "\n")
+                if stats is not None:
+                    stats.add(result)
+                if result['status'] == 'error':
+                    exit_code = 1
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader has gone away (e.g. piped into head): stop quietly,
+            # and keep Python from failing again when it flushes stdout
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        finally:
+            if cache is not None:
+                cache.close()
+            if journal is not None:
+                journal.close()
+
+        if args.stats:
+            print("\n".join(stats.format_table()), file=sys.stderr)
+        if args.stats_json:
+            write_stats(stats, args.stats_json, folder)
+
+    if plan_file is not None:
+        plan_file.close()
+    return exit_code
+
+
+def check_files(file_paths):
+    """Print type and Date Last Saved of files without renaming them
+
+    One tab-separated line per file: path, extension and date, '-' where
+    unknown. Returns 1 if a file could not be read, else 0.
+    """
+    exit_code = 0
+    for file_path in file_paths:
+        new_ext, date_name, error, _ = analyze_chk_file(file_path)
+        if error:
+            print(f"❌ {file_path}: {error}", file=sys.stderr)
+            exit_code = 1
+            continue
+        print(f"{file_path}\t{new_ext or '-'}\t{date_name or '-'}")
+    return exit_code
+
+
+def main(argv=None):
+    """Main program: batch mode with arguments, interactive without"""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ['--check'] and len(argv) > 1 and not any(
+            arg.startswith('-') for arg in argv[1:]):
+        # Fast path for per-file hooks: no argument parser is built
+        return check_files(argv[1:])
+
+    if argv:
+        parser = build_arg_parser()
+        args = parser.parse_args(argv)
+        if not args.folders and not args.apply and not args.check:
+            parser.error("at least one FOLDER is required")
+        if args.plan and (args.carve or args.dedupe == 'hardlink'):
+            parser.error("--plan cannot be combined with --carve or --dedupe hardlink")
+        if args.output_dir and (args.carve or args.empty_dir or args.plan or args.apply
+                                or args.undo):
+            parser.error("--output-dir leaves the .chk files untouched and cannot be "
+                         "combined with --carve, --empty-dir, --plan, --apply or --undo")
+        if args.progress_rate is not None and args.progress_rate <= 0:
+            parser.error("--progress-rate must be greater than 0")
+        if args.output_format == 'jsonl' and (args.quiet or args.log
+                                              or args.progress_rate is not None):
+            parser.error("--quiet, --log and --progress-rate only apply to "
+                         "--output-format text")
+        if args.no_journal and (args.journal or args.resume or args.undo):
+            parser.error("--no-journal cannot be combined with --journal, --resume or --undo")
+        return run_batch(args)
+
+    interactive_main()
+    return 0
+
+
+def interactive_main():
+    """Interactive program"""
     print_header()
 
     try:
@@ -396,15 +2808,25 @@ def main():
         folder_path = get_folder_input()
 
         if folder_path:
+            print("Recovered files can be copied to a separate folder,")
+            print("leaving the .chk files untouched.")
+            output_dir = input("Output folder (empty = rename in place): ").strip().strip('"')
+            print()
+
             # Safety confirmation
             print("IMPORTANT NOTICE:")
-            print("The .chk files will be renamed and this cannot be undone!")
-            print("Create a backup copy of the folder beforehand if necessary.")
+            if output_dir:
+                print(f"The recovered files will be copied to {output_dir}.")
+            else:
+                print("The .chk files will be renamed. The renames are journaled and")
+                print(f"can be reversed with: python chk_recovery.py --undo \"{folder_path}\"")
             print()
 
             confirm = input("Continue? (y/n): ").lower()
             if confirm == 'y':
-                process_chk_files(folder_path)
+                journal_path = None if output_dir else os.path.join(folder_path, JOURNAL_NAME)
+                process_chk_files(folder_path, journal_path=journal_path,
+                                  output_dir=output_dir or None)
             else:
                 print("Operation cancelled.")
         else:
@@ -420,4 +2842,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""Tests for the classification cache"""
+
+import sqlite3
+
+import chk_recovery
+
+
+def test_cache_round_trip(tmp_path):
+    cache = chk_recovery.ClassificationCache(str(tmp_path / 'cache.db'))
+    cache.put('key', '.pdf', None)
+    cache.flush()
+    assert cache.get('key') == ('.pdf', None)
+    cache.close()
+
+    cache = chk_recovery.ClassificationCache(str(tmp_path / 'cache.db'))
+    assert cache.get('key') == ('.pdf', None)
+    assert cache.get('other') is None
+    cache.close()
+
+
+def test_eviction(tmp_path):
+    cache = chk_recovery.ClassificationCache(str(tmp_path / 'cache.db'), max_entries=10)
+    for i in range(25):
+        cache.put(str(i), '.pdf', None)
+    cache.flush()
+    assert cache.get('0') is None
+    assert cache.get('24') == ('.pdf', None)
+    cache.close()
+
+
+def test_changed_file_gets_new_key(tmp_path):
+    path = tmp_path / 'FILE0000.CHK'
+    path.write_bytes(b'%PDF-1.4')
+    key = chk_recovery.ClassificationCache.make_key(str(path), b'%PDF-1.4')
+    path.write_bytes(b'%PDF-1.4 changed')
+    assert chk_recovery.ClassificationCache.make_key(str(path), b'%PDF-1.4') != key
+
+
+def test_cache_write_errors_are_ignored(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = chk_recovery.ClassificationCache(path)
+    cache.db.close()
+    cache.db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    for i in range(chk_recovery.CACHE_COMMIT_INTERVAL + 1):
+        cache.put(str(i), '.pdf', None)
+    cache.flush()
+    assert cache.get('0') is None
+    cache.close()
@@ -0,0 +1,92 @@
+"""Tests for carving .chk files that hold several files"""
+
+import os
+import struct
+import zlib
+
+import pytest
+
+import chk_recovery
+
+
+def png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+PNG = (b'\x89PNG\r\n\x1a\n'
+       + png_chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+       + png_chunk(b'IDAT', zlib.compress(b'\x00' * 4))
+       + png_chunk(b'IEND', b''))
+GIF = b'GIF89a' + bytes(range(32)) * 4 + b'\x3b'
+
+
+def make_carvable(folder, count):
+    """Write count .chk files holding a PNG and a GIF at a 512-byte boundary"""
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(folder, f'F{i:05d}.CHK'), 'wb') as f:
+            f.write(PNG.ljust(512, b'\x00') + GIF)
+
+
+def test_find_embedded_headers():
+    data = PNG.ljust(512, b'\x00') + GIF.ljust(512, b'\x00') + b'%PDF-1.4'
+    assert chk_recovery.find_embedded_headers(data) == [0, 512, 1024]
+    # Signatures off the alignment are not file starts
+    assert chk_recovery.find_embedded_headers(b'\x00' * 100 + GIF) == []
+
+
+def test_carve_chk_file(tmp_path):
+    folder = str(tmp_path)
+    make_carvable(folder, 1)
+    pieces = chk_recovery.carve_chk_file(os.path.join(folder, 'F00000.CHK'))
+    assert [os.path.basename(piece) for piece in pieces] == ['F00000_part000.chk',
+                                                            'F00000_part001.chk']
+    assert sorted(os.listdir(folder)) == ['F00000.CHK.carved', 'F00000_part000.chk',
+                                          'F00000_part001.chk']
+    with open(pieces[1], 'rb') as f:
+        assert f.read() == GIF
+
+
+def test_carve_removes_pieces_on_failure(tmp_path):
+    folder = str(tmp_path / 'FOUND.000')
+    make_carvable(folder, 1)
+    # Left over by an earlier, interrupted carve
+    open(os.path.join(folder, 'F00000_part001.chk'), 'wb').close()
+    with pytest.raises(FileExistsError):
+        chk_recovery.carve_chk_file(os.path.join(folder, 'F00000.CHK'))
+    assert sorted(os.listdir(folder)) == ['F00000.CHK', 'F00000_part001.chk']
+
+
+def test_carve_folder(tmp_path, capsys):
+    # More files than one directory read returns, so that pieces written
+    # during a still running scan would show up in it
+    folder = str(tmp_path / 'FOUND.000')
+    make_carvable(folder, 2000)
+    chk_recovery.process_chk_files(folder, carve=True, quiet=True)
+    out = capsys.readouterr().out
+    assert 'Successfully recovered:        4000' in out
+    assert 'Errors:                       0' in out
+    names = os.listdir(folder)
+    assert sum(name.endswith('.png') for name in names) == 2000
+    assert sum(name.endswith('.gif') for name in names) == 2000
+
+
+JPEG = (b'\xFF\xD8\xFF\xE0' + struct.pack('>H', 16) + b'JFIF\x00' + bytes(9)
+        + b'\xFF\xDA' + struct.pack('>H', 8) + bytes(6) + b'\x12' * 2000 + b'\xFF\xD9')
+BMP = (b'BM' + struct.pack('<L2HL', 1000, 0, 0, 54) + struct.pack('<L', 40)
+       + b'\x01' * 946)
+MP3 = b'ID3\x03\x00' + bytes(5) + b'\xFF\xFB\x90\x00' + b'\x01' * 900
+
+
+@pytest.mark.parametrize('piece', [JPEG, BMP, MP3])
+def test_short_signature_formats(piece):
+    data = GIF.ljust(512, b'\x00') + piece.ljust(2048, b'\x00') + PNG
+    assert chk_recovery.find_embedded_headers(data) == [0, 512, 2560]
+
+
+def test_jpeg_data_is_not_split():
+    # A signature on a sector boundary inside the JPEG's own data
+    jpeg = bytearray(JPEG)
+    jpeg[512:517] = b'%PDF-'
+    assert chk_recovery.find_embedded_headers(bytes(jpeg) + bytes(100)) == [0]
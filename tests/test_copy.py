@@ -0,0 +1,65 @@
+"""Tests for copying recovered files into an output folder"""
+
+import os
+
+import chk_recovery
+
+PDF = b'%PDF-1.4\n' + bytes(range(32)) * 8 + b'\n%%EOF\n'
+
+
+def make_folder(tmp_path, count=2):
+    folder = tmp_path / 'FOUND.000'
+    folder.mkdir()
+    for i in range(count):
+        (folder / f'FILE{i:04d}.CHK').write_bytes(PDF + bytes([i]))
+    return str(folder)
+
+
+def test_copy_chk_file(tmp_path):
+    folder = make_folder(tmp_path, 1)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    src = os.path.join(folder, 'FILE0000.CHK')
+    new_path, slack = chk_recovery.copy_chk_file(src, '.pdf', None, str(output_dir))
+    assert os.listdir(output_dir) == ['FILE0000.pdf']
+    assert slack == 0
+    with open(new_path, 'rb') as f:
+        assert f.read() == PDF + b'\x00'
+    assert os.path.exists(src)
+
+    new_path, _ = chk_recovery.copy_chk_file(src, '.pdf', '2024-01-15_14-30-22',
+                                             str(output_dir))
+    assert os.path.basename(new_path) == '2024-01-15_14-30-22.pdf'
+
+
+def test_copy_with_trim(tmp_path):
+    src = tmp_path / 'FILE0000.CHK'
+    src.write_bytes(PDF + bytes(4000))
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    new_path, slack = chk_recovery.copy_chk_file(str(src), '.pdf', None, str(output_dir),
+                                                 trim=True)
+    assert slack == 4000
+    assert os.path.getsize(new_path) == len(PDF)
+    assert src.stat().st_size == len(PDF) + 4000
+
+
+def test_resume_copies(tmp_path, capsys):
+    folder = make_folder(tmp_path, 2)
+    output_dir = str(tmp_path / 'out')
+    journal_path = str(tmp_path / 'journal.jsonl')
+    chk_recovery.process_chk_files(folder, journal_path=journal_path, output_dir=output_dir,
+                                   quiet=True)
+    assert sorted(os.listdir(output_dir)) == ['FILE0000.pdf', 'FILE0001.pdf']
+
+    # Drop the 'seen' records, as if the run stopped right after the copies
+    with open(journal_path) as f:
+        lines = [line for line in f if '"seen"' not in line]
+    with open(journal_path, 'w') as f:
+        f.writelines(lines)
+
+    chk_recovery.process_chk_files(folder, journal_path=journal_path, output_dir=output_dir,
+                                   resume=True, quiet=True)
+    assert 'Total processed:              0' in capsys.readouterr().out
+    assert sorted(os.listdir(output_dir)) == ['FILE0000.pdf', 'FILE0001.pdf']
+    assert sorted(os.listdir(folder)) == ['FILE0000.CHK', 'FILE0001.CHK']
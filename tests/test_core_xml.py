@@ -0,0 +1,91 @@
+"""Tests for reading dcterms:modified from docProps/core.xml"""
+
+import io
+import zipfile
+
+import pytest
+
+import chk_recovery
+from bench_chk_recovery import CORE_XML
+
+DATE_NAME = '2024-01-15_14-30-22'
+
+
+def core_xml(date='2024-01-15T14:30:22Z', **replace):
+    text = CORE_XML.format(date=date)
+    for old, new in replace.items():
+        text = text.replace(old, new)
+    return text.encode('utf-8')
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_every_chunk_size():
+    data = core_xml()
+    for size in range(1, len(data) + 1):
+        assert chk_recovery.scan_core_xml_date(split(data, size)) == DATE_NAME, size
+
+
+def test_stops_after_the_element():
+    data = core_xml() + b'<!--' + b'x' * 100000 + b'-->'
+    chunks = iter(split(data, 64))
+    assert chk_recovery.scan_core_xml_date(chunks) == DATE_NAME
+    assert next(chunks, None) is not None
+
+
+@pytest.mark.parametrize('date, expected', [
+    ('2024-01-15T14:30:22Z', DATE_NAME),
+    ('2024-01-15T14:30:22', DATE_NAME),
+    ('2024-01-15T14:30:22+02:00', DATE_NAME),
+    ('2024-02-29T00:00:00Z', '2024-02-29_00-00-00'),
+    # Left to the ElementTree fallback
+    ('2024-01-15T14:30:22.123Z', DATE_NAME),
+    ('2023-02-29T00:00:00Z', None),
+    ('2024-13-01T00:00:00Z', None),
+    ('garbage', None),
+    ('', None),
+])
+def test_dates(date, expected):
+    assert chk_recovery.scan_core_xml_date(split(core_xml(date), 7)) == expected
+
+
+def test_format_iso_date():
+    assert chk_recovery.format_iso_date(b'2000-02-29T23:59:59Z') == '2000-02-29_23-59-59'
+    assert chk_recovery.format_iso_date(b'1900-02-29T00:00:00Z') is None
+    assert chk_recovery.format_iso_date(b'2024-01-15T24:00:00Z') is None
+    assert chk_recovery.format_iso_date(b'2024-01-15T14:30:22.5Z') is None
+    assert chk_recovery.format_iso_date(b'2024-01-15 14:30:22') is None
+
+
+def test_empty_and_missing_element():
+    empty = core_xml().replace(b'>2024-01-15T14:30:22Z</dcterms:modified>', b'/>')
+    assert chk_recovery.scan_core_xml_date([empty]) is None
+    missing = core_xml().replace(b'dcterms:modified', b'dcterms:created')
+    assert chk_recovery.scan_core_xml_date(split(missing, 5)) is None
+
+
+def test_other_prefix():
+    data = core_xml(**{'xmlns:dcterms': 'xmlns:dt', 'dcterms:': 'dt:'})
+    assert b'<dcterms:modified' not in data
+    assert chk_recovery.scan_core_xml_date(split(data, 16)) == DATE_NAME
+
+
+def test_utf16():
+    data = core_xml(**{'UTF-8': 'UTF-16'}).decode('utf-8').encode('utf-16')
+    assert chk_recovery.scan_core_xml_date(split(data, 16)) == DATE_NAME
+
+
+def test_size_limit():
+    data = core_xml(**{'<dcterms:created': '<!--' + ' ' * 1000 + '--><dcterms:created'})
+    assert chk_recovery.scan_core_xml_date(split(data, 100)) == DATE_NAME
+    assert chk_recovery.scan_core_xml_date(split(data, 100), max_size=len(data) // 2) is None
+
+
+def test_zipfile_member():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('docProps/core.xml', core_xml())
+    with zipfile.ZipFile(buffer) as zf:
+        assert chk_recovery.read_core_xml_date(zf) == DATE_NAME
@@ -0,0 +1,64 @@
+"""Tests for the handling of byte-identical .chk files"""
+
+import os
+
+import chk_recovery
+
+PDF = b'%PDF-1.4\n' + bytes(range(32)) * 8 + b'\n%%EOF\n'
+
+
+def recover(folder, dedupe, **options):
+    names = sorted(chk_recovery.list_chk_files(str(folder)))
+    return {result['file']: result for result in
+            chk_recovery.iter_recovery(str(folder), names, dedupe=dedupe, **options)}
+
+
+def test_find_duplicates(tmp_path):
+    block = chk_recovery.DEDUP_BLOCK
+    big = os.urandom(3 * block)
+    # Same size, first and last block; only the middle differs
+    changed = big[:block] + bytes(block) + big[2 * block:]
+    for name, data in (('A.CHK', big), ('B.CHK', big), ('C.CHK', changed),
+                       ('D.CHK', b'small'), ('E.CHK', b'small'), ('F.CHK', b'other')):
+        (tmp_path / name).write_bytes(data)
+    names = ['B.CHK', 'A.CHK', 'C.CHK', 'D.CHK', 'E.CHK', 'F.CHK']
+    assert chk_recovery.find_duplicates(str(tmp_path), names) == {
+        'A.CHK': 'B.CHK', 'E.CHK': 'D.CHK'}
+
+
+def test_hardlink(tmp_path):
+    for name in ('A.CHK', 'B.CHK'):
+        (tmp_path / name).write_bytes(PDF)
+    results = recover(tmp_path, 'hardlink')
+    assert results['A.CHK']['status'] == 'recovered'
+    assert results['B.CHK']['status'] == 'recovered'
+    assert results['B.CHK']['duplicate_of'] == 'A.CHK'
+    original = tmp_path / results['A.CHK']['new_name']
+    linked = tmp_path / results['B.CHK']['new_name']
+    assert original != linked
+    assert os.path.samefile(original, linked)
+    assert chk_recovery.list_chk_files(str(tmp_path)) == []
+
+
+def test_hardlink_into_output_dir(tmp_path):
+    folder = tmp_path / 'FOUND.000'
+    output_dir = tmp_path / 'out'
+    folder.mkdir()
+    for name in ('A.CHK', 'B.CHK'):
+        (folder / name).write_bytes(PDF)
+    results = recover(folder, 'hardlink', output_dir=str(output_dir))
+    assert sorted(os.listdir(folder)) == ['A.CHK', 'B.CHK']
+    copies = [output_dir / results[name]['new_name'] for name in ('A.CHK', 'B.CHK')]
+    assert os.path.samefile(*copies)
+
+
+def test_skip_and_report(tmp_path):
+    for name in ('A.CHK', 'B.CHK'):
+        (tmp_path / name).write_bytes(PDF)
+    results = recover(tmp_path, 'skip', dry_run=True)
+    assert results['B.CHK']['status'] == 'duplicate'
+    assert results['B.CHK']['new_name'] is None
+
+    results = recover(tmp_path, 'report', dry_run=True)
+    assert results['B.CHK']['status'] == 'recovered'
+    assert results['B.CHK']['duplicate_of'] == 'A.CHK'
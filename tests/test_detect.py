@@ -0,0 +1,21 @@
+"""Tests for text detection"""
+
+import chk_recovery
+
+
+def test_text_ratio():
+    assert chk_recovery.text_ratio(b'plain text\r\n') == 1.0
+    assert chk_recovery.text_ratio(b'') == 0.0
+    assert chk_recovery.text_ratio(b'\x00' * 100) == 0.0
+    # Bytes >= 128 (potential UTF-8) count half
+    assert chk_recovery.text_ratio(b'ab\xc3\xbc') == 0.75
+    # Only the first 512 bytes are sampled
+    assert chk_recovery.text_ratio(b'a' * 512 + b'\x00' * 512) == 1.0
+
+
+def test_is_text_file():
+    headers = [b'plain text\r\n' * 50, bytes(range(256)) * 3, b'',
+               'Grüße aus Köln '.encode('utf-8') * 40, b'\x00' * 100, b'x']
+    assert [chk_recovery.is_text_file(header) for header in headers] == [
+        True, False, False, True, False, True]
+    assert chk_recovery.is_text_file(b'\xff\xfeU\x00T\x00F\x00')
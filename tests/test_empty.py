@@ -0,0 +1,49 @@
+"""Tests for the detection of empty and all-zero .chk files"""
+
+import chk_recovery
+
+MB = 1024 * 1024
+
+
+def test_empty_and_zero_files(tmp_path):
+    (tmp_path / 'empty').write_bytes(b'')
+    (tmp_path / 'zeros').write_bytes(bytes(3 * MB + 5))
+    (tmp_path / 'tail').write_bytes(bytes(3 * MB) + b'\x01')
+    assert chk_recovery.is_empty_file(str(tmp_path / 'empty'))
+    assert chk_recovery.is_empty_file(str(tmp_path / 'zeros'))
+    assert not chk_recovery.is_empty_file(str(tmp_path / 'tail'))
+
+
+def test_header_answers_first(tmp_path):
+    (tmp_path / 'zeros').write_bytes(bytes(100))
+    assert not chk_recovery.is_empty_file(str(tmp_path / 'zeros'), header=b'\x00\x01')
+
+
+def test_sparse_files(tmp_path):
+    path = str(tmp_path / 'sparse')
+    with open(path, 'wb') as f:
+        f.truncate(64 * MB)
+    assert chk_recovery.is_empty_file(path)
+
+    with open(path, 'r+b') as f:
+        f.seek(40 * MB)
+        f.write(b'data')
+    assert not chk_recovery.is_empty_file(path)
+
+
+def test_data_regions_cover_the_data(tmp_path):
+    path = str(tmp_path / 'sparse')
+    with open(path, 'wb') as f:
+        f.truncate(64 * MB)
+        f.seek(40 * MB)
+        f.write(b'data')
+    with open(path, 'rb') as f:
+        regions = list(chk_recovery._data_regions(f.fileno(), 64 * MB))
+    assert any(start <= 40 * MB and 40 * MB + 4 <= end for start, end in regions)
+    assert all(0 <= start < end <= 64 * MB for start, end in regions)
+
+
+def test_analysis_reports_empty_type(tmp_path):
+    (tmp_path / 'FILE0000.CHK').write_bytes(bytes(4096))
+    ext, date, error, _ = chk_recovery.analyze_chk_file(str(tmp_path / 'FILE0000.CHK'))
+    assert (ext, date, error) == (chk_recovery.EMPTY_TYPE, None, None)
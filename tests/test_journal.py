@@ -0,0 +1,99 @@
+"""Tests for the recovery journal, resume and undo"""
+
+import os
+
+import chk_recovery
+
+PDF = b'%PDF-1.4\n' + bytes(range(32)) * 8 + b'\n%%EOF\n'
+
+
+def make_folder(tmp_path, count=3):
+    folder = tmp_path / 'FOUND.000'
+    folder.mkdir()
+    for i in range(count):
+        (folder / f'FILE{i:04d}.CHK').write_bytes(PDF + bytes([i]))
+    return str(folder)
+
+
+def records(path):
+    return [(record['op'], os.path.basename(record['src'])) for record in
+            chk_recovery.read_journal(path)]
+
+
+def test_resume_after_torn_rename(tmp_path):
+    folder = make_folder(tmp_path, 1)
+    src = os.path.join(folder, 'FILE0000.CHK')
+    dst = os.path.join(folder, 'FILE0000.pdf')
+    journal_path = str(tmp_path / 'journal.jsonl')
+    with chk_recovery.RecoveryJournal(journal_path) as journal:
+        journal.record('plan', src, dst)
+    # Crash between the link and the unlink of rename_no_replace
+    os.link(src, dst)
+
+    with chk_recovery.RecoveryJournal(journal_path) as journal:
+        assert chk_recovery.resume_journal(journal) == {src}
+    assert sorted(os.listdir(folder)) == ['FILE0000.pdf']
+    assert records(journal_path)[-1] == ('done', 'FILE0000.CHK')
+
+
+def test_resume_checks_planned_renames(tmp_path):
+    folder = make_folder(tmp_path, 3)
+    path = lambda name: os.path.join(folder, name)
+    journal_path = str(tmp_path / 'journal.jsonl')
+    with chk_recovery.RecoveryJournal(journal_path) as journal:
+        # Renamed, but the 'done' record was lost
+        journal.record('plan', path('FILE0000.CHK'), path('FILE0000.pdf'))
+        os.rename(path('FILE0000.CHK'), path('FILE0000.pdf'))
+        # Planned, but never renamed
+        journal.record('plan', path('FILE0001.CHK'), path('FILE0001.pdf'))
+        journal.record('seen', path('FILE0002.CHK'), status='error')
+
+    with chk_recovery.RecoveryJournal(journal_path) as journal:
+        assert chk_recovery.resume_journal(journal) == {path('FILE0000.CHK')}
+    assert os.path.exists(path('FILE0001.CHK'))
+
+
+def test_torn_last_line(tmp_path):
+    journal_path = tmp_path / 'journal.jsonl'
+    journal_path.write_text('{"op": "done", "src": "a", "dst": "b"}\n{"op": "pl')
+    with chk_recovery.RecoveryJournal(str(journal_path)) as journal:
+        journal.record('seen', 'c', status='unknown')
+    assert records(str(journal_path)) == [('done', 'a'), ('seen', 'c')]
+
+
+def test_process_resume_and_undo(tmp_path, capsys):
+    folder = make_folder(tmp_path, 3)
+    journal_path = str(tmp_path / 'journal.jsonl')
+    chk_recovery.process_chk_files(folder, journal_path=journal_path, quiet=True)
+    assert sorted(os.listdir(folder)) == ['FILE0000.pdf', 'FILE0001.pdf', 'FILE0002.pdf']
+
+    chk_recovery.process_chk_files(folder, journal_path=journal_path, resume=True, quiet=True)
+    assert 'Total processed:              0' in capsys.readouterr().out
+
+    assert chk_recovery.undo_journal(journal_path) == (3, 0)
+    assert sorted(os.listdir(folder)) == ['FILE0000.CHK', 'FILE0001.CHK', 'FILE0002.CHK']
+    assert chk_recovery.undo_journal(journal_path) == (0, 0)
+
+
+
+def test_batch_run_is_journaled_by_default(tmp_path, capsys):
+    folder = make_folder(tmp_path, 2)
+    assert chk_recovery.main([folder, '-y', '-q']) == 0
+    assert sorted(os.listdir(folder)) == ['FILE0000.pdf', 'FILE0001.pdf',
+                                          chk_recovery.JOURNAL_NAME]
+    assert chk_recovery.main([folder, '--undo']) == 0
+    assert sorted(os.listdir(folder)) == ['FILE0000.CHK', 'FILE0001.CHK',
+                                          chk_recovery.JOURNAL_NAME]
+
+
+def test_no_journal(tmp_path, capsys):
+    folder = make_folder(tmp_path, 2)
+    assert chk_recovery.main([folder, '-y', '-q', '--no-journal']) == 0
+    assert sorted(os.listdir(folder)) == ['FILE0000.pdf', 'FILE0001.pdf']
+
+
+def test_resume_without_journal(tmp_path, capsys):
+    folder = make_folder(tmp_path, 2)
+    assert chk_recovery.main([folder, '-y', '--resume']) == 1
+    assert 'No journal found' in capsys.readouterr().err
+    assert sorted(os.listdir(folder)) == ['FILE0000.CHK', 'FILE0001.CHK']
@@ -0,0 +1,52 @@
+"""Tests for the JSON Lines output of batch runs"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import chk_recovery
+
+PDF = b'%PDF-1.4\n' + bytes(range(32)) * 8 + b'\n%%EOF\n'
+
+
+def make_folder(tmp_path, count=2):
+    folder = tmp_path / 'FOUND.000'
+    folder.mkdir()
+    for i in range(count):
+        (folder / f'FILE{i:04d}.CHK').write_bytes(PDF + i.to_bytes(4, 'little'))
+    (folder / 'FILE9999.CHK').write_bytes(b'\x00' * 64)
+    return str(folder)
+
+
+def test_one_record_per_file(tmp_path, capsys):
+    folder = make_folder(tmp_path)
+    assert chk_recovery.main([folder, '--dry-run', '--output-format', 'jsonl']) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted((record['file'], record['status'], record['ext'])
+                  for record in records) == [('FILE0000.CHK', 'recovered', '.pdf'),
+                                             ('FILE0001.CHK', 'recovered', '.pdf'),
+                                             ('FILE9999.CHK', 'empty', None)]
+    assert all(record['new_name'] and record['new_name'].endswith('.pdf')
+               for record in records if record['status'] == 'recovered')
+    assert sorted(os.listdir(folder)) == ['FILE0000.CHK', 'FILE0001.CHK', 'FILE9999.CHK']
+
+
+@pytest.mark.parametrize('option', [['--quiet'], ['--log', 'x.log'], ['--progress-rate', '2']])
+def test_text_options_are_rejected(tmp_path, option):
+    with pytest.raises(SystemExit):
+        chk_recovery.main([str(tmp_path), '--output-format', 'jsonl'] + option)
+
+
+def test_closed_pipe(tmp_path):
+    folder = make_folder(tmp_path, 2000)
+    script = os.path.join(os.path.dirname(chk_recovery.__file__), 'chk_recovery.py')
+    process = subprocess.Popen([sys.executable, script, folder, '--dry-run',
+                                '--output-format', 'jsonl'],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert json.loads(process.stdout.readline())['status'] == 'recovered'
+    process.stdout.close()
+    assert process.wait() == 1
+    assert process.stderr.read() == b''
@@ -0,0 +1,30 @@
+"""Tests for picking free names for recovered files"""
+
+import chk_recovery
+
+
+def test_suffixes(tmp_path):
+    index = chk_recovery.NameIndex(str(tmp_path))
+    assert [index.reserve('2021-03-04', '.docx') for _ in range(3)] == [
+        '2021-03-04.docx', '2021-03-04_001.docx', '2021-03-04_002.docx']
+    assert index.reserve('2021-03-04', '.xlsx') == '2021-03-04.xlsx'
+
+
+def test_existing_names_are_skipped(tmp_path):
+    for name in ('report.pdf', 'report_001.pdf', 'report_003.pdf'):
+        (tmp_path / name).write_bytes(b'')
+    index = chk_recovery.NameIndex(str(tmp_path))
+    assert [index.reserve('report', '.pdf') for _ in range(3)] == [
+        'report_002.pdf', 'report_004.pdf', 'report_005.pdf']
+
+
+def test_case_folding(tmp_path):
+    (tmp_path / 'REPORT.PDF').write_bytes(b'')
+    index = chk_recovery.NameIndex(str(tmp_path))
+    assert index.reserve('report', '.pdf') == 'report_001.pdf'
+    assert index.reserve('Report', '.Pdf') == 'Report_002.Pdf'
+
+
+def test_missing_folder(tmp_path):
+    index = chk_recovery.NameIndex(str(tmp_path / 'out'))
+    assert index.reserve('a', '.jpg') == 'a.jpg'
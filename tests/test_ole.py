@@ -0,0 +1,67 @@
+"""Tests for the Compound File Binary reader and OLE dating"""
+
+import calendar
+import io
+import struct
+from datetime import datetime
+
+import pytest
+
+import chk_recovery
+from bench_chk_recovery import build_ole_document
+
+DATE = datetime(2020, 5, 6, 7, 8, 9)
+FILETIME = chk_recovery.FILETIME_UNIX_EPOCH + calendar.timegm(DATE.timetuple()) * 10 ** 7
+
+
+def write_document(tmp_path, data, name='FILE0000.CHK'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('mini_summary', [True, False])
+@pytest.mark.parametrize('body_size', [4096, 131072])
+def test_read_ole_last_saved(tmp_path, mini_summary, body_size):
+    path = write_document(tmp_path, build_ole_document(DATE, body_size, mini_summary))
+    with open(path, 'rb') as f:
+        assert chk_recovery.read_ole_last_saved(f) == FILETIME
+
+
+@pytest.mark.parametrize('mini_summary', [True, False])
+def test_summary_stream_location(tmp_path, mini_summary):
+    path = write_document(tmp_path, build_ole_document(DATE, 4096, mini_summary))
+    with open(path, 'rb') as f:
+        ole = chk_recovery.CompoundFile(f)
+        entry = ole.find_entry('\x05SummaryInformation')
+        assert (entry[3] < ole.mini_cutoff) == mini_summary
+        assert ole.read_stream(entry)[:2] == b'\xfe\xff'
+
+
+def test_document_type_and_date(tmp_path):
+    path = write_document(tmp_path, build_ole_document(DATE, 8192))
+    assert chk_recovery.detect_file_type(path) == '.doc'
+    assert chk_recovery.get_file_date(path, '.doc') == chk_recovery.filetime_to_name(FILETIME)
+
+
+def test_damaged_directory_falls_back_to_scan(tmp_path):
+    data = bytearray(build_ole_document(DATE, 4096))
+    # Point the directory at a sector beyond the end of the file
+    struct.pack_into('<L', data, 48, 0x1000)
+    path = write_document(tmp_path, bytes(data))
+    with open(path, 'rb') as f:
+        with pytest.raises(ValueError):
+            chk_recovery.read_ole_last_saved(f)
+    assert chk_recovery.get_ole_document_date(path) == chk_recovery.filetime_to_name(FILETIME)
+
+
+def test_not_a_compound_file():
+    with pytest.raises(ValueError):
+        chk_recovery.CompoundFile(io.BytesIO(b'\x00' * 1024))
+
+
+def test_filetime_to_name_range():
+    assert chk_recovery.filetime_to_name(0) is None
+    assert chk_recovery.filetime_to_name(chk_recovery.FILETIME_UNIX_EPOCH) is None
+    assert chk_recovery.filetime_to_name(FILETIME) == (
+        datetime.fromtimestamp(calendar.timegm(DATE.timetuple())).strftime("%Y-%m-%d_%H-%M-%S"))
@@ -0,0 +1,50 @@
+"""Tests for the process pool and its ordering guarantees"""
+
+import os
+
+import pytest
+
+import chk_recovery
+from bench_chk_recovery import generate_corpus
+
+MIX = {'signature': 1, 'ooxml': 1, 'ole': 1, 'text': 1, 'zero': 1, 'unknown': 1}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    folder = str(tmp_path / 'FOUND.000')
+    generate_corpus(folder, 150, MIX, seed=3)
+    return folder
+
+
+def analyses(folder, **options):
+    paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))]
+    return [(ext, date, error) for ext, date, error, _ in
+            chk_recovery.iter_analysis(paths, **options)]
+
+
+def test_workers_keep_input_order(corpus):
+    expected = analyses(corpus)
+    assert len({ext for ext, _, _ in expected}) > 4
+    assert analyses(corpus, workers=3, batch_size=7) == expected
+
+
+def test_workers_rename_like_one_process(tmp_path):
+    names = {}
+    for workers in (1, 3):
+        folder = str(tmp_path / f'run{workers}')
+        generate_corpus(folder, 150, MIX, seed=3)
+        results = chk_recovery.iter_recovery(folder, sorted(os.listdir(folder)),
+                                             workers=workers)
+        names[workers] = [(result['file'], result['status'], result['new_name'])
+                          for result in results]
+    assert names[3] == names[1]
+    assert [name for name, _, _ in names[1]] == sorted(name for name, _, _ in names[1])
+
+
+def test_bounded_map_keeps_order():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(chk_recovery._bounded_map(executor, lambda x: x * x, range(50), 3)) == [
+            x * x for x in range(50)]
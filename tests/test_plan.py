@@ -0,0 +1,76 @@
+"""Tests for two-phase runs with a rename plan"""
+
+import json
+import os
+
+import pytest
+
+import chk_recovery
+
+PDF = b'%PDF-1.4\n' + bytes(range(32)) * 8 + b'\n%%EOF\n'
+
+
+def make_folder(tmp_path, count=3):
+    folder = tmp_path / 'FOUND.000'
+    folder.mkdir()
+    for i in range(count):
+        (folder / f'FILE{i:04d}.CHK').write_bytes(PDF + bytes([i]))
+    (folder / 'FILE9999.CHK').write_bytes(b'\x00' * 64)
+    return str(folder)
+
+
+def write_plan(tmp_path, folder, empty_dir=None):
+    plan_path = str(tmp_path / 'plan.jsonl')
+    with open(plan_path, 'w', encoding='utf-8') as f:
+        for record in chk_recovery.iter_rename_plan(folder, chk_recovery.list_chk_files(folder),
+                                                    empty_dir=empty_dir):
+            f.write(json.dumps(record) + "\n")
+    return plan_path
+
+
+def test_rename_no_replace(tmp_path):
+    (tmp_path / 'a').write_bytes(b'a')
+    (tmp_path / 'b').write_bytes(b'b')
+    with pytest.raises(FileExistsError):
+        chk_recovery.rename_no_replace(str(tmp_path / 'a'), str(tmp_path / 'b'))
+    assert (tmp_path / 'b').read_bytes() == b'b'
+    chk_recovery.rename_no_replace(str(tmp_path / 'a'), str(tmp_path / 'c'))
+    assert sorted(os.listdir(tmp_path)) == ['b', 'c']
+
+
+def test_plan_changes_nothing(tmp_path):
+    folder = make_folder(tmp_path)
+    plan_path = write_plan(tmp_path, folder, empty_dir='empty')
+    records = list(chk_recovery.read_journal(plan_path))
+    assert sorted((record['src'], record['dst']) for record in records) == [
+        ('FILE0000.CHK', 'FILE0000.pdf'), ('FILE0001.CHK', 'FILE0001.pdf'),
+        ('FILE0002.CHK', 'FILE0002.pdf'), ('FILE9999.CHK', os.path.join('empty', 'FILE9999.CHK'))]
+    assert len(os.listdir(folder)) == 4
+
+
+def test_apply_and_reapply(tmp_path):
+    folder = make_folder(tmp_path)
+    plan_path = write_plan(tmp_path, folder, empty_dir='empty')
+    journal_path = str(tmp_path / 'journal.jsonl')
+    with chk_recovery.RecoveryJournal(journal_path) as journal:
+        counts = chk_recovery.apply_rename_plan(plan_path, journal=journal)
+    assert counts == {'renamed': 4, 'applied': 0, 'failed': 0, 'trimmed': 0}
+    assert sorted(os.listdir(folder)) == ['FILE0000.pdf', 'FILE0001.pdf', 'FILE0002.pdf', 'empty']
+    assert os.listdir(os.path.join(folder, 'empty')) == ['FILE9999.CHK']
+    assert [record['op'] for record in chk_recovery.read_journal(journal_path)] == [
+        'plan', 'done'] * 4
+
+    counts = chk_recovery.apply_rename_plan(plan_path)
+    assert counts == {'renamed': 0, 'applied': 4, 'failed': 0, 'trimmed': 0}
+
+
+def test_taken_destination_is_not_overwritten(tmp_path):
+    folder = make_folder(tmp_path, 1)
+    plan_path = write_plan(tmp_path, folder)
+    with open(os.path.join(folder, 'FILE0000.pdf'), 'wb') as f:
+        f.write(b'other')
+    counts = chk_recovery.apply_rename_plan(plan_path)
+    assert counts['failed'] == 1
+    with open(os.path.join(folder, 'FILE0000.pdf'), 'rb') as f:
+        assert f.read() == b'other'
+    assert os.path.exists(os.path.join(folder, 'FILE0000.CHK'))
@@ -0,0 +1,34 @@
+"""Tests for reading file headers ahead in threads"""
+
+import os
+
+import chk_recovery
+from bench_chk_recovery import generate_corpus
+
+MIX = {'signature': 1, 'ooxml': 1, 'ole': 1, 'text': 1, 'zero': 1, 'unknown': 1}
+
+
+def test_headers_in_input_order(tmp_path):
+    generate_corpus(str(tmp_path), 100, MIX, seed=5)
+    paths = [str(tmp_path / name) for name in sorted(os.listdir(tmp_path))]
+    assert list(chk_recovery.iter_headers(paths, 8)) == [
+        (path, chk_recovery.read_header(path)) for path in paths]
+
+
+def test_prefetch_gives_the_same_results(tmp_path):
+    generate_corpus(str(tmp_path), 100, MIX, seed=5)
+    paths = [str(tmp_path / name) for name in sorted(os.listdir(tmp_path))]
+    expected = [analysis[:3] for analysis in chk_recovery.iter_analysis(paths)]
+    assert [analysis[:3] for analysis in
+            chk_recovery.iter_analysis(paths, prefetch=16)] == expected
+
+
+def test_unreadable_file_is_reported_in_place(tmp_path):
+    (tmp_path / 'A.CHK').write_bytes(b'%PDF-1.4\n' + bytes(range(32)) * 8)
+    paths = [str(tmp_path / 'A.CHK'), str(tmp_path / 'MISSING.CHK')]
+    (_, a_header), (_, missing_header) = chk_recovery.iter_headers(paths, 2)
+    assert a_header.startswith(b'%PDF') and missing_header is None
+
+    results = list(chk_recovery.iter_analysis(paths, prefetch=2))
+    assert results[0][0] == '.pdf'
+    assert results[1][0] is None and results[1][2]
@@ -0,0 +1,47 @@
+"""Tests for the progress display and the per-file log"""
+
+import io
+
+import pytest
+
+import chk_recovery
+
+
+def result(status, ext=None, **fields):
+    return dict({'file': 'FILE0000.CHK', 'status': status, 'ext': ext, 'new_name': None,
+                 'duplicate_of': None, 'error': None}, **fields)
+
+
+def test_format_line():
+    progress = chk_recovery.ProgressDisplay(io.StringIO())
+    progress.total = 4
+    progress.update(result('recovered', '.jpg'), 1048576)
+    progress.update(result('recovered', '.jpg'))
+    progress.update(result('unknown'))
+    line = progress.format_line(progress.started + 1)
+    assert line.startswith('[3/4]  75%  3 files/s  1.0 MB/s  ETA 0:00:00')
+    assert '✓ 2 ❓ 1 ∅ 0 ❌ 0' in line
+    assert line.endswith('.jpg 2')
+
+
+def test_piped_output_is_rate_limited():
+    stream = io.StringIO()
+    progress = chk_recovery.ProgressDisplay(stream)
+    for _ in range(1000):
+        progress.update(result('recovered', '.pdf'))
+    progress.finish()
+    assert stream.getvalue().count('\n') == 1
+
+
+def test_format_result_line():
+    assert (chk_recovery.format_result_line(result('recovered', '.pdf', new_name='A.pdf'))
+            == 'FILE0000.CHK... ✓ → A.pdf')
+    assert (chk_recovery.format_result_line(result('error', error='boom'))
+            == 'FILE0000.CHK... ❌ Error: boom')
+
+
+@pytest.mark.parametrize('rate', ['0', '-1'])
+def test_progress_rate_must_be_positive(tmp_path, rate):
+    with pytest.raises(SystemExit) as exc_info:
+        chk_recovery.main([str(tmp_path), '--yes', '--progress-rate', rate])
+    assert exc_info.value.code == 2
@@ -0,0 +1,28 @@
+"""Tests for the asyncio entry point recover_folder"""
+
+import asyncio
+import os
+
+import chk_recovery
+
+PDF = b'%PDF-1.4\n' + bytes(range(32)) * 8 + b'\n%%EOF\n'
+
+
+async def collect(folder, **options):
+    return [result async for result in chk_recovery.recover_folder(folder, **options)]
+
+
+def test_results_in_directory_order(tmp_path):
+    for i in range(20):
+        (tmp_path / f'FILE{i:04d}.CHK').write_bytes(PDF + bytes([i]))
+    (tmp_path / 'FILE0020.CHK').write_bytes(b'\xde\xad\xbe\xef' * 64)
+    names = chk_recovery.list_chk_files(str(tmp_path))
+
+    results = asyncio.run(collect(str(tmp_path), concurrency=3))
+    assert [result['file'] for result in results] == names
+    statuses = {result['file']: result['status'] for result in results}
+    assert statuses.pop('FILE0020.CHK') == 'unknown'
+    assert set(statuses.values()) == {'recovered'}
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ['FILE0020.CHK'] + [f'FILE{i:04d}.pdf' for i in range(20)])
+
@@ -0,0 +1,38 @@
+"""Tests for the streaming directory scan"""
+
+import os
+
+import chk_recovery
+
+
+def test_iter_chk_entries(tmp_path):
+    for name in ('A.CHK', 'b.chk', 'c.txt', 'D.CHK.carved'):
+        (tmp_path / name).write_bytes(b'x')
+    (tmp_path / 'E.CHK').mkdir()
+    names = sorted(entry.name for entry in chk_recovery.iter_chk_entries(str(tmp_path)))
+    assert names == ['A.CHK', 'b.chk']
+
+
+def test_iter_sized_names(tmp_path):
+    (tmp_path / 'A.CHK').write_bytes(b'x' * 10)
+    sizes = {}
+    assert list(chk_recovery.iter_sized_names(str(tmp_path), sizes)) == ['A.CHK']
+    assert sizes == {'A.CHK': 10}
+
+
+def test_progress_total_while_renaming(tmp_path, capsys):
+    for i in range(400):
+        (tmp_path / f'FILE{i:04d}.CHK').write_bytes(b'%PDF-1.4\n' + bytes(range(32)) * 8)
+    chk_recovery.process_chk_files(str(tmp_path))
+    assert '[400/400] 100%' in capsys.readouterr().out
+
+
+def test_progress_total_on_resume(tmp_path, capsys):
+    for i in range(4):
+        (tmp_path / f'FILE{i:04d}.CHK').write_bytes(b'%PDF-1.4\n' + bytes(range(32)) * 8)
+    journal_path = str(tmp_path / 'journal.jsonl')
+    journal = chk_recovery.RecoveryJournal(journal_path)
+    journal.record('seen', str(tmp_path / 'FILE0000.CHK'), status='unknown')
+    journal.close()
+    chk_recovery.process_chk_files(str(tmp_path), journal_path=journal_path, resume=True)
+    assert '[3/3] 100%' in capsys.readouterr().out
@@ -0,0 +1,41 @@
+"""Tests for the signature index and RIFF subtypes"""
+
+import random
+import struct
+
+import pytest
+
+import chk_recovery
+
+
+def longest_match(header):
+    matches = [sig for sig in chk_recovery.SIGNATURES if header.startswith(sig)]
+    return chk_recovery.SIGNATURES[max(matches, key=len)] if matches else None
+
+
+def test_longest_signature_wins():
+    assert chk_recovery.match_signature(b'\x00\x00\x01\x00' + bytes(8)) == '.ico'
+    assert chk_recovery.match_signature(b'\x00\x00\x01\xBA' + bytes(8)) == '.mpg'
+    assert chk_recovery.match_signature(b'Rar!\x1A\x07\x01\x00') == '.rar'
+    assert chk_recovery.match_signature(b'\x00\x00\x00\x18ftypmp42') == '.mp4'
+    assert chk_recovery.match_signature(b'') is None
+    assert chk_recovery.match_signature(b'\x00\x01') is None
+
+
+def test_index_matches_a_linear_scan():
+    rnd = random.Random(1)
+    headers = [sig + bytes(rnd.randrange(256) for _ in range(4))
+               for sig in chk_recovery.SIGNATURES]
+    headers += [sig[:-1] for sig in chk_recovery.SIGNATURES if len(sig) > 1]
+    headers += [bytes(rnd.randrange(256) for _ in range(12)) for _ in range(2000)]
+    for header in headers:
+        assert chk_recovery.match_signature(header) == longest_match(header), header
+
+
+@pytest.mark.parametrize('form, ext', [(b'WAVE', '.wav'), (b'AVI ', '.avi'),
+                                       (b'WEBP', '.webp'), (b'XXXX', '.avi')])
+def test_riff_forms(tmp_path, form, ext):
+    path = str(tmp_path / 'FILE0000.CHK')
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<L', 1000) + form + bytes(range(256)) * 4)
+    assert chk_recovery.detect_file_type(path) == ext
@@ -0,0 +1,62 @@
+"""Tests for the per-stage statistics"""
+
+import json
+
+import pytest
+
+import chk_recovery
+
+PDF = b'%PDF-1.4\n' + bytes(range(32)) * 8 + b'\n%%EOF\n'
+
+
+def result(ext, status='recovered', **timings):
+    return {'ext': ext, 'status': status, 'timings': timings}
+
+
+def test_counts_and_percentiles():
+    stats = chk_recovery.PipelineStats()
+    for _ in range(100):
+        stats.add(result('.pdf', analyze=10e-6, rename=1e-3))
+    for _ in range(10):
+        stats.add(result(None, 'unknown', analyze=5e-3))
+
+    stages = stats.to_dict()['stages']
+    assert stages['analyze']['count'] == 110
+    assert stages['analyze']['total'] == pytest.approx(100 * 10e-6 + 10 * 5e-3)
+    assert stages['analyze']['max'] == 5e-3
+    # 10 µs falls into the bucket up to 16 µs; the slowest call caps the top
+    assert stages['analyze']['p50'] == 16e-6
+    assert stages['analyze']['p95'] == 5e-3
+    assert stages['analyze']['histogram_us'] == {'16': 100, '8192': 10}
+    assert stages['rename']['count'] == 100
+
+    types = stats.to_dict()['types']
+    assert types['.pdf']['files'] == 100
+    assert types['.pdf']['rename'] == pytest.approx(0.1)
+    assert types['unknown']['files'] == 10
+    assert types['unknown']['analyze'] == pytest.approx(0.05)
+
+
+def test_format_table():
+    stats = chk_recovery.PipelineStats()
+    stats.add(result('.pdf', analyze=2e-3, rename=1e-3))
+    lines = stats.format_table()
+    assert lines[0].split()[:3] == ['Stage', 'Calls', 'Total']
+    assert [line.split()[0] for line in lines[1:3]] == ['analyze', 'rename']
+    assert lines[-1].split()[:2] == ['.pdf', '1']
+
+
+def test_stats_json(tmp_path, capsys):
+    folder = tmp_path / 'FOUND.000'
+    folder.mkdir()
+    for i in range(3):
+        (folder / f'FILE{i:04d}.CHK').write_bytes(PDF + bytes([i]))
+    stats_path = tmp_path / 'stats.jsonl'
+    assert chk_recovery.main([str(folder), '-y', '-q', '--stats',
+                              '--stats-json', str(stats_path)]) == 0
+    assert 'analyze' in capsys.readouterr().out
+    record = json.loads(stats_path.read_text(encoding='utf-8'))
+    assert record['folder'] == str(folder)
+    assert record['stages']['analyze']['count'] == 3
+    assert record['stages']['rename']['count'] == 3
+    assert record['types']['.pdf']['files'] == 3
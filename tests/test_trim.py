@@ -0,0 +1,93 @@
+"""Tests for true end-of-file detection and trimming"""
+
+import struct
+import zlib
+
+import pytest
+
+import chk_recovery
+
+SLACK = bytes(chk_recovery.TRIM_CLUSTER_SIZE * 2)
+
+
+def png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+PNG = (b'\x89PNG\r\n\x1a\n'
+       + png_chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+       + png_chunk(b'IDAT', zlib.compress(b'\x00' * 4))
+       + png_chunk(b'IEND', b''))
+JPEG = (b'\xFF\xD8\xFF\xE0' + struct.pack('>H', 16) + b'JFIF\x00' + bytes(9)
+        + b'\xFF\xDA' + struct.pack('>H', 8) + bytes(6) + b'\x12\x34\xFF\x00\x56'
+        + b'\xFF\xD9')
+MP4 = struct.pack('>L4s4s', 16, b'ftyp', b'isom') + bytes(4) + struct.pack('>L4s', 16, b'mdat') + b'\x01' * 8
+
+
+def riff(form, payload, size=None):
+    size = len(payload) + 4 if size is None else size
+    return b'RIFF' + struct.pack('<L', size) + form + payload
+
+
+WAV = riff(b'WAVE', b'fmt ' + struct.pack('<L', 16) + bytes(16) + b'data' + struct.pack('<L', 1000)
+           + b'\x01' * 1000)
+
+
+@pytest.mark.parametrize('data, ext, end', [
+    (PNG + SLACK, '.png', len(PNG)),
+    (JPEG + SLACK, '.jpg', len(JPEG)),
+    (WAV + SLACK, '.wav', len(WAV)),
+    (b'%PDF-1.4\n%%EOF\n' + SLACK, '.pdf', 15),
+    (MP4 + SLACK, '.mp4', len(MP4)),
+    (PNG, '.png', len(PNG)),
+])
+def test_find_file_end(data, ext, end):
+    assert chk_recovery.find_file_end(data, ext) == end
+
+
+def test_find_file_end_unknown():
+    assert chk_recovery.find_file_end(b'GIF89a' + SLACK, '.gif') is None
+    # Structure cut off before its end
+    assert chk_recovery.find_file_end(PNG[:-12], '.png') is None
+    assert chk_recovery.find_file_end(JPEG[:-2], '.jpg') is None
+
+
+def test_riff_size_zero():
+    data = riff(b'WAVE', WAV[12:], size=0)
+    assert chk_recovery.find_file_end(data, '.wav') is None
+
+
+def test_opendml_avi():
+    first = riff(b'AVI ', b'\x01' * 1000)
+    data = first + riff(b'AVIX', b'\x02' * 5000) + riff(b'AVIX', b'\x03' * 100)
+    assert chk_recovery.find_file_end(data + SLACK, '.avi') == len(data)
+    # An unrelated RIFF file after the end is not part of it
+    assert chk_recovery.find_file_end(first + WAV, '.avi') == len(first)
+
+
+def test_jpeg_with_appended_images():
+    mpf = JPEG + JPEG
+    assert chk_recovery.find_file_end(mpf + SLACK, '.jpg') == len(mpf)
+    motion = JPEG + MP4
+    assert chk_recovery.find_file_end(motion + SLACK, '.jpg') == len(motion)
+    # An appended image that cannot be walked leaves the end unknown
+    assert chk_recovery.find_file_end(JPEG + JPEG[:20], '.jpg') is None
+
+
+@pytest.mark.parametrize('data, ext, size', [
+    (PNG + SLACK, '.png', len(PNG)),
+    # Less than a cluster of non-zero data: slack
+    (PNG + b'\xAA' * 100, '.png', len(PNG)),
+    # A cluster or more of non-zero data after the end: kept
+    (PNG + b'\xAA' * chk_recovery.TRIM_CLUSTER_SIZE, '.png', None),
+    (riff(b'WAVE', WAV[12:], size=0) + SLACK, '.wav', None),
+    (riff(b'AVI ', b'\x01' * 1000) + riff(b'AVIX', b'\x02' * 5000), '.avi', None),
+    (b'GIF89a' + SLACK, '.gif', None),
+])
+def test_trim_file(tmp_path, data, ext, size):
+    path = tmp_path / 'FILE0000.CHK'
+    path.write_bytes(data)
+    size = len(data) if size is None else size
+    assert chk_recovery.trim_file(str(path), ext) == len(data) - size
+    assert path.read_bytes() == data[:size]
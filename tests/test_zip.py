@@ -0,0 +1,142 @@
+"""Tests for the streaming ZIP directory scan and its zipfile fallback"""
+
+import io
+import struct
+import zipfile
+from datetime import datetime
+
+import pytest
+
+import chk_recovery
+from bench_chk_recovery import build_ooxml_document
+
+DATE = datetime(2024, 1, 15, 14, 30, 22)
+DATE_NAME = '2024-01-15_14-30-22'
+
+
+def build_zip(members, comment=b''):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+        zf.comment = comment
+    return buffer.getvalue()
+
+
+def to_zip64(data):
+    """Rewrite the end of central directory of data as a ZIP64 one"""
+    eocd = data.rfind(b'PK\x05\x06')
+    (_, _, _, _, count, cd_size, cd_offset,
+     comment_len) = struct.unpack('<4s4H2LH', data[eocd:eocd + 22])
+    zip64_eocd = struct.pack('<4sQ2H2L4Q', b'PK\x06\x06', 44, 45, 45, 0, 0,
+                             count, count, cd_size, cd_offset)
+    locator = struct.pack('<4sLQL', b'PK\x06\x07', 0, eocd, 1)
+    end = struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, 0xFFFF, 0xFFFF,
+                      0xFFFFFFFF, 0xFFFFFFFF, comment_len)
+    return data[:eocd] + zip64_eocd + locator + end + data[eocd + 22:]
+
+
+def write_chk(tmp_path, data, name='FILE0000.CHK'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def scan(path, with_date=True):
+    """Run the streaming scan only, without the zipfile fallback"""
+    with open(path, 'rb') as f:
+        ext, core_entry = chk_recovery.scan_zip_directory(f, with_date)
+        date_name = None
+        if core_entry is not None:
+            date_name = chk_recovery.scan_core_xml_date(
+                chk_recovery.iter_zip_member(f, core_entry))
+    return ext, date_name
+
+
+@pytest.mark.parametrize('kind, part, ext', [
+    ('word', 'document.xml', '.docx'),
+    ('xl', 'workbook.xml', '.xlsx'),
+    ('ppt', 'presentation.xml', '.pptx'),
+])
+def test_office_documents(tmp_path, kind, part, ext):
+    path = write_chk(tmp_path, build_ooxml_document(kind, part, DATE))
+    assert scan(path) == (ext, DATE_NAME)
+    assert chk_recovery.analyze_zip(path, with_date=True) == (ext, DATE_NAME)
+    assert chk_recovery.analyze_zip_file(path, with_date=True) == (ext, DATE_NAME)
+    assert chk_recovery.detect_file_type(path) == ext
+
+
+def test_without_date(tmp_path):
+    path = write_chk(tmp_path, build_ooxml_document('word', 'document.xml', DATE))
+    assert scan(path, with_date=False) == ('.docx', None)
+
+
+def test_prefixed_archive(tmp_path):
+    # Data in front of the archive shifts every recorded offset
+    data = b'\x00' * 1000 + build_ooxml_document('word', 'document.xml', DATE)
+    path = write_chk(tmp_path, data)
+    assert scan(path) == ('.docx', DATE_NAME)
+
+
+def test_archive_comment(tmp_path):
+    data = build_zip([('[Content_Types].xml', '<Types/>'), ('xl/workbook.xml', '<x/>'),
+                      ('docProps/core.xml', '<dcterms:modified>2024-01-15T14:30:22Z'
+                                            '</dcterms:modified>')],
+                     comment=b'PK' * 2000)
+    path = write_chk(tmp_path, data)
+    assert scan(path) == ('.xlsx', DATE_NAME)
+
+
+def test_zip64_falls_back_to_zipfile(tmp_path):
+    path = write_chk(tmp_path, to_zip64(build_ooxml_document('ppt', 'presentation.xml', DATE)))
+    with open(path, 'rb') as f:
+        with pytest.raises(chk_recovery.ZipScanError):
+            chk_recovery.scan_zip_directory(f, True)
+    assert chk_recovery.analyze_zip(path, with_date=True) == ('.pptx', DATE_NAME)
+
+
+@pytest.mark.parametrize('members, ext', [
+    ([('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0')], '.jar'),
+    ([('AndroidManifest.xml', '<manifest/>')], '.apk'),
+    ([('readme.txt', 'hello'), ('word/document.xml', '<x/>')], '.zip'),
+])
+def test_other_archives(tmp_path, members, ext):
+    path = write_chk(tmp_path, build_zip(members))
+    assert scan(path) == (ext, None)
+    assert chk_recovery.analyze_zip(path) == (ext, None)
+
+
+def test_stored_member(tmp_path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        zf.writestr('[Content_Types].xml', '<Types/>')
+        zf.writestr('word/document.xml', '<x/>')
+        zf.writestr('docProps/core.xml', '<dcterms:modified>2024-01-15T14:30:22Z'
+                                         '</dcterms:modified>')
+    path = write_chk(tmp_path, buffer.getvalue())
+    assert scan(path) == ('.docx', DATE_NAME)
+
+
+def test_truncated_archive(tmp_path):
+    path = write_chk(tmp_path, build_ooxml_document('word', 'document.xml', DATE)[:200])
+    with open(path, 'rb') as f:
+        with pytest.raises(chk_recovery.ZipScanError):
+            chk_recovery.scan_zip_directory(f)
+    assert chk_recovery.analyze_zip(path, with_date=True) == ('.zip', None)
+
+
+@pytest.mark.parametrize('names', [
+    ['META-INF/MANIFEST.MF', '[Content_Types].xml', 'word/document.xml'],
+    ['AndroidManifest.xml', 'xl/workbook.xml', '[Content_Types].xml'],
+    ['[Content_Types].xml', 'ppt/presentation.xml', 'xl/workbook.xml', 'word/document.xml'],
+    ['[Content_Types].xml', 'xl/workbook.xml', 'ppt/presentation.xml'],
+    ['AndroidManifest.xml', 'META-INF/MANIFEST.MF', 'classes.dex'],
+    ['word/document.xml', 'META-INF/MANIFEST.MF'],
+    ['[Content_Types].xml', 'AndroidManifest.xml'],
+])
+@pytest.mark.parametrize('with_date', [False, True])
+def test_precedence_matches_zip_subtype(tmp_path, names, with_date):
+    path = write_chk(tmp_path, build_zip([(name, '<x/>') for name in names]))
+    with open(path, 'rb') as f:
+        ext, _ = chk_recovery.scan_zip_directory(f, with_date)
+    assert ext == chk_recovery.zip_subtype(names)